@@ -2,8 +2,13 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html
 
+from datastore import maps_blueprint
+
 app = dash.Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
+# Vorgerenderte Karten der Seite "Routes" werden per URL statt als srcDoc ausgeliefert
+app.server.register_blueprint(maps_blueprint)
+
 app.layout = html.Div(style={'backgroundColor': '#ffffff', 'color': '#333333'}, children=[
     dbc.Navbar(
         dbc.Container(
@@ -42,5 +47,11 @@ app.layout = html.Div(style={'backgroundColor': '#ffffff', 'color': '#333333'},
     )
 ])
 
+# Gesamtnetz-Karten der Seite "Routes" im Hintergrund vorrendern; die Seite wurde oben
+# von dash.Dash(use_pages=True) geladen, der Import liefert nur das vorhandene Modul
+from pages.routes import prerender_route_maps
+
+prerender_route_maps()
+
 if __name__ == "__main__":
     app.run_server(debug=True)
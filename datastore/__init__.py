@@ -0,0 +1,9 @@
+from .store import DATA_DIR, MONTHS, SCHEMAS, build_store, data_version, load_summaries, load_summary, store_path, write_summary
+from .cube import ALL, FilterCube, YearlyTotals
+from .cache import ResultCache, memoize, prune_versions
+from .maps import MapStore, maps_blueprint
+from .shared import load_shared_summaries
+from .routes import RouteDataset, load_route_dataset
+from .live import BACKEND, ConnectionPool, LiveCube, LiveRouteDataset
+from .formatting import decimal, k_or_m, percent, thousands
+from .facts import FACTS_DIR, facts_dataset, scan_facts
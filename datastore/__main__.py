@@ -0,0 +1,22 @@
+import argparse
+
+from .store import DATA_DIR, SCHEMAS, build_store
+
+
+# Aufruf: python -m datastore [--data-dir PFAD] [NAME ...]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Baut den lokalen Parquet-Speicher aus den CSV-Zusammenfassungen auf.")
+    parser.add_argument('names', nargs='*', help="Zusammenfassungen (Standard: alle)")
+    parser.add_argument('--data-dir', default=str(DATA_DIR))
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(SCHEMAS)
+    if unknown:
+        parser.error(f"unbekannte Zusammenfassung: {', '.join(sorted(unknown))}")
+
+    for path in build_store(args.data_dir, args.names or None):
+        print(f"geschrieben: {path}")
+
+
+if __name__ == '__main__':
+    main()
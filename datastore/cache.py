@@ -0,0 +1,166 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .store import DATA_DIR
+
+
+# Gemeinsames Verzeichnis aller Worker (z.B. mehrerer gunicorn-Prozesse); leer = nur im Prozess cachen
+CACHE_DIR = os.environ.get('FLIGHTS_CACHE_DIR', str(DATA_DIR / '.cache' / 'callbacks'))
+
+# Obergrenzen für die Anzahl der Einträge je Callback im Prozess und auf der Platte
+MEMORY_ENTRIES = int(os.environ.get('FLIGHTS_CACHE_MEMORY_ENTRIES', 64))
+DISK_ENTRIES = int(os.environ.get('FLIGHTS_CACHE_DISK_ENTRIES', 512))
+
+# Verzeichnisse älterer Versionen werden erst entfernt, wenn sie so lange (Sekunden) nicht benutzt wurden
+VERSION_MAX_AGE = int(os.environ.get('FLIGHTS_CACHE_VERSION_MAX_AGE', 7 * 24 * 3600))
+
+
+# Verzeichnis für eine Datenversion; die Änderungszeit vermerkt die letzte Benutzung.
+# Andere Versionen bleiben unberührt, aufgeräumt wird nur von prune_versions.
+def version_dir(root, version):
+    directory = Path(root) / version
+    directory.mkdir(parents=True, exist_ok=True)
+    os.utime(directory)
+    return directory
+
+
+# Entfernt unter <root>/<name>/<version> die Versionen, die seit max_age nicht benutzt wurden;
+# die zuletzt benutzte Version je Name bleibt immer stehen. Wird von der Pipeline aufgerufen,
+# nicht von den Workern, damit kein Worker beim Start die Dateien eines anderen löscht.
+def prune_versions(root, max_age=VERSION_MAX_AGE):
+    root = Path(root)
+    if not root.is_dir():
+        return
+    cutoff = time.time() - max_age
+    for name in root.iterdir():
+        if not name.is_dir():
+            continue
+        versions = []
+        for path in name.iterdir():
+            try:
+                if path.is_dir():
+                    versions.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        for mtime, path in sorted(versions)[:-1]:
+            if mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+# Kennung des Quelltexts, in dem eine Funktion definiert ist; geänderter Code verwirft alte Einträge
+def code_version(func):
+    try:
+        source = Path(inspect.getsourcefile(func)).read_bytes()
+    except (OSError, TypeError):
+        return 'nocode'
+    return hashlib.sha1(source).hexdigest()[:8]
+
+
+class ResultCache:
+    """LRU-Cache für Callback-Ergebnisse, vorne im Prozess und dahinter auf der Platte.
+
+    Die Einträge liegen unter <cache_dir>/<namespace>/<version>/; ändert sich die
+    Datenversion, werden die Einträge der alten Versionen nicht mehr gelesen und
+    von der Pipeline nach VERSION_MAX_AGE entfernt (prune_versions).
+    """
+
+    def __init__(self, namespace, version, cache_dir=CACHE_DIR, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Das Verzeichnis wird nur alle paar Schreibvorgänge auf die Obergrenze gekürzt, nicht bei jedem;
+        # dazwischen kann es je Worker um bis zu so viele Einträge darüber liegen
+        self._evict_every = max(disk_entries // 16, 1)
+        self._writes = 0
+        self.directory = version_dir(Path(cache_dir) / namespace, version) if cache_dir else None
+
+    @staticmethod
+    def key(args, kwargs):
+        return hashlib.sha1(pickle.dumps((args, sorted(kwargs.items())))).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return True, self._memory[key]
+        if self.directory is None:
+            return False, None
+        path = self.directory / f"{key}.pkl"
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Fehlt, wurde gerade verdrängt oder ist unvollständig: neu berechnen
+            return False, None
+        self._remember(key, value)
+        return True, value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.directory is None:
+            return
+        path = self.directory / f"{key}.pkl"
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._writes += 1
+            evict = self._writes >= self._evict_every
+            if evict:
+                self._writes = 0
+        if evict:
+            self._evict()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # Älteste Einträge (nach letztem Zugriff) entfernen, bis die Obergrenze eingehalten ist
+    def _evict(self):
+        try:
+            entries = [(path.stat().st_mtime, path) for path in self.directory.glob('*.pkl')]
+        except OSError:
+            return
+        for _, path in sorted(entries)[:max(len(entries) - self.disk_entries, 0)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+# Merkt sich die Ergebnisse einer Funktion, die nur von ihren Argumenten und den geladenen Daten abhängt
+def memoize(namespace, version, **options):
+    def decorator(func):
+        cache = ResultCache(namespace, f"{version}-{code_version(func)}", **options)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache.key(args, kwargs)
+            hit, value = cache.get(key)
+            if not hit:
+                value = func(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
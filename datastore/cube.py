@@ -0,0 +1,123 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+
+# Wert der Dropdowns für "keine Einschränkung"
+ALL = 'Alle'
+
+# Filterdimensionen der Flights-Seite (Reihenfolge der Schlüssel im Würfel)
+CANCELLATION_DIMS = ('airline', 'cancellation_reason', 'year', 'month')
+AIRLINE_DIMS = ('airline', 'year', 'month')
+
+# Aufschlüsselungen der Stornierungen, die von den Callbacks abgefragt werden
+BREAKDOWNS = (
+    ('airline',),
+    ('cancellation_reason',),
+    ('cancellation_reason', 'airline'),
+    ('year',),
+)
+
+
+# Anzahl der zuletzt abgefragten Auswahlen, deren Ergebnis je Würfel im Speicher bleibt
+CELLS = 4096
+
+
+def _to_series(cell, by):
+    if len(by) > 1:
+        index = pd.MultiIndex.from_arrays(list(zip(*cell)) or [[]] * len(by), names=by)
+    else:
+        index = pd.Index(list(cell), name=by[0])
+    return pd.Series(list(cell.values()), index=index, name='cancellations', dtype='int64').sort_index()
+
+
+# Zeilen, die zur Auswahl passen ('Alle' schränkt die Dimension nicht ein)
+def _mask(columns, key):
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    for dim, value in key.items():
+        if value != ALL:
+            mask &= columns[dim] == value
+    return mask
+
+
+class FilterCube:
+    """Ergebnisse der vier Dropdowns aus einer einmal verdichteten Tabelle.
+
+    Die Stornierungen werden beim Laden einmal je Airline, Grund, Jahr und Monat summiert;
+    eine Auswahl (inkl. 'Alle' je Dimension) filtert nur noch diese kleine Tabelle.
+    Die zuletzt abgefragten Auswahlen bleiben je Würfel in einem LRU-Cache.
+    """
+
+    def __init__(self, cancellations, airlines):
+        self.empty_airlines = airlines.iloc[0:0]
+        self._base = cancellations.groupby(list(CANCELLATION_DIMS), observed=True)['cancellations'].sum().reset_index()
+        self._base_columns = {dim: self._base[dim].to_numpy(dtype=object) for dim in CANCELLATION_DIMS}
+        self._airlines = airlines
+        self._airline_columns = {dim: airlines[dim].to_numpy(dtype=object) for dim in AIRLINE_DIMS}
+        self._cancellations_cell = functools.lru_cache(maxsize=CELLS)(self._build_cancellations)
+        self._airlines_cell = functools.lru_cache(maxsize=CELLS)(self._build_airlines)
+        self.years = sorted(self.cancellations('year').index)
+
+    def _build_cancellations(self, by, key):
+        rows = self._base[_mask(self._base_columns, dict(zip(CANCELLATION_DIMS, key)))]
+        sums = rows.groupby(list(by), observed=True)['cancellations'].sum()
+        keys = zip(*[sums.index.get_level_values(dim).tolist() for dim in by])
+        cell = {by_key if len(by) > 1 else by_key[0]: total for by_key, total in zip(keys, sums.tolist())}
+        return _to_series(cell, by)
+
+    def _build_airlines(self, key):
+        mask = _mask(self._airline_columns, dict(zip(AIRLINE_DIMS, key)))
+        return self._airlines[mask] if mask.any() else self.empty_airlines
+
+    # Summe der Stornierungen je Wert von "by" für die gewählten Filter
+    def cancellations(self, by, airline=ALL, reason=ALL, year=ALL, month=ALL):
+        by = (by,) if isinstance(by, str) else tuple(by)
+        return self._cancellations_cell(by, (airline, reason, year, month))
+
+    # Zeilen der Airline-Statistik für die gewählten Filter; einen Stornogrund gibt es dort nicht
+    def airlines(self, airline=ALL, year=ALL, month=ALL):
+        return self._airlines_cell((airline, year, month))
+
+
+class YearlyTotals:
+    """Jahressummen, Abweichungen zum Vorjahr und Monatsreihen je Jahr für die Kästchen im Kopf der Seite.
+
+    Einmal beim Laden berechnet; get(year) liefert ein Wörterbuch mit den Werten eines Jahres.
+    Ohne Vorjahr sind die Abweichungen None.
+    """
+
+    def __init__(self, cancellations, airlines):
+        flights_monthly = airlines.groupby(['year', 'month'], observed=True)['total_flights'].sum()
+        cancellations_monthly = cancellations.groupby(['year', 'month'], observed=True)['cancellations'].sum()
+        airline_counts = airlines.groupby('year', observed=True)['airline'].nunique()
+
+        self._years = {}
+        for year in sorted(set(flights_monthly.index.unique('year')) | set(cancellations_monthly.index.unique('year'))):
+            self._years[int(year)] = {
+                'flights_monthly': self._months(flights_monthly, year),
+                'cancellations_monthly': self._months(cancellations_monthly, year),
+                'airlines': int(airline_counts.get(year, 0)),
+            }
+        for year, totals in self._years.items():
+            previous = self._years.get(year - 1)
+            for measure in ('flights', 'cancellations'):
+                total = int(totals[f'{measure}_monthly'].sum())
+                totals[measure] = total
+                previous_total = int(previous[f'{measure}_monthly'].sum()) if previous and not previous[f'{measure}_monthly'].empty else None
+                totals[f'previous_{measure}'] = previous_total
+                totals[f'{measure}_delta'] = None if previous_total is None else total - previous_total
+                totals[f'{measure}_delta_percent'] = None if not previous_total else (total - previous_total) / previous_total * 100
+
+    @staticmethod
+    def _months(monthly, year):
+        if year not in monthly.index.unique('year'):
+            return monthly.iloc[0:0].droplevel('year')
+        return monthly.xs(year, level='year').sort_index()
+
+    @property
+    def years(self):
+        return list(self._years)
+
+    def get(self, year):
+        return self._years.get(int(year))
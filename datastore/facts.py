@@ -0,0 +1,33 @@
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from .store import DATA_DIR
+
+
+# Flugdaten von vw_OneBigTable als Parquet-Datensatz, partitioniert nach Jahr und Monat
+# (facts/year=2015/month_int=3/*.parquet); geschrieben von "python -m etl --facts"
+FACTS_DIR = Path(os.environ.get('FLIGHTS_FACTS_DIR', DATA_DIR / 'facts'))
+
+# Typen wie in den Parquet-Dateien, die die Partitionsspalten ebenfalls enthalten
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int16()), ('month_int', pa.int32())]), flavor='hive')
+
+
+def facts_dataset(directory=None):
+    return ds.dataset(str(directory or FACTS_DIR), format='parquet', partitioning=PARTITIONING)
+
+
+# Liest nur die angegebenen Spalten der passenden Partitionen. Filter auf year und month_int
+# wählen Verzeichnisse aus, alle übrigen (z.B. airline) werden anhand der Min/Max-Werte der
+# Row Groups vorgeprüft. Eine Liste als Wert steht für mehrere erlaubte Werte.
+def scan_facts(columns=None, directory=None, **filters):
+    expression = None
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            condition = ds.field(column).isin(list(value))
+        else:
+            condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return facts_dataset(directory).to_table(columns=columns, filter=expression).to_pandas()
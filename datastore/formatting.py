@@ -0,0 +1,57 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+
+# Zahlenformate der Seiten (deutsch: Punkt als Tausendertrennzeichen, Komma als Dezimalzeichen).
+# Alle Formatierer arbeiten auf ganzen Series bzw. Arrays; ein einzelner Wert ergibt einen String.
+
+def _vectorized(func):
+    @functools.wraps(func)
+    def wrapper(values, *args, **kwargs):
+        if np.ndim(values) == 0:
+            return func(pd.Series([values]), *args, **kwargs).iloc[0]
+        if not isinstance(values, pd.Series):
+            values = pd.Series(values)
+        return func(values, *args, **kwargs)
+
+    return wrapper
+
+
+def _printf(pattern, numbers, index):
+    return pd.Series(np.char.mod(pattern, numbers), index=index, dtype=object)
+
+
+# 1234567 -> "1.234.567"; signed=True -> "+1.234.567"
+@_vectorized
+def thousands(values, signed=False):
+    numbers = values.to_numpy(dtype=float)
+    missing = ~np.isfinite(numbers)
+    integers = np.where(missing, 0, np.round(numbers)).astype(np.int64)
+    digits = _printf('%+d' if signed else '%d', integers, values.index)
+    return digits.str.replace(r'(\d)(?=(?:\d{3})+$)', r'\1.', regex=True).mask(missing, '')
+
+
+# 12.345 -> "12,3"; signed=True -> "+12,3"
+@_vectorized
+def decimal(values, digits=1, signed=False):
+    pattern = f"%{'+' if signed else ''}.{digits}f"
+    return _printf(pattern, values.to_numpy(dtype=float), values.index).str.replace('.', ',', regex=False)
+
+
+# 12.345 -> "12,3 %"
+@_vectorized
+def percent(values, digits=1, signed=False, unit=' %'):
+    return decimal(values, digits, signed) + unit
+
+
+# 1234567 -> "1,2 M", 12345 -> "12,3 K", kleinere Werte unverändert
+@_vectorized
+def k_or_m(values):
+    numbers = values.to_numpy(dtype=float)
+    millions = numbers >= 1e6
+    thousands_ = (numbers >= 1e3) & ~millions
+    scaled = decimal(pd.Series(np.select([millions, thousands_], [numbers / 1e6, numbers / 1e3], numbers), index=values.index))
+    suffix = pd.Series(np.select([millions, thousands_], [' M', ' K'], ''), index=values.index)
+    return (scaled + suffix).where(millions | thousands_, values.astype(str))
@@ -0,0 +1,228 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from .cube import ALL
+from .routes import RouteDataset
+from .store import DATA_DIR, MONTHS, apply_schema, share_dictionaries
+
+
+# "store" = Zusammenfassungen aus dem Datenspeicher (Standard), "duckdb" = Abfragen direkt auf der Datenbank
+BACKEND = os.environ.get('FLIGHTS_BACKEND', 'store')
+
+# Von "python -m etl" aufgebaute Datenbank; wird nur lesend geöffnet
+DATABASE = os.environ.get('FLIGHTS_DUCKDB', str(DATA_DIR / 'flights.duckdb'))
+
+# Monatsname ("Jan") -> Monatszahl in SQL
+MONTH_NUMBER = "list_position([" + ", ".join(f"'{month}'" for month in MONTHS) + "], {column})"
+
+
+class ConnectionPool:
+    """Schreibgeschützte DuckDB-Verbindung je Worker-Prozess, ein Cursor je Thread.
+
+    Nach einem fork (z.B. gunicorn --preload) wird im neuen Prozess neu verbunden.
+    """
+
+    def __init__(self, database=DATABASE):
+        self.database = str(database)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._connection = None
+        self._local = threading.local()
+
+    @property
+    def version(self):
+        stat = Path(self.database).stat()
+        return hashlib.sha1(f"{self.database}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+    def cursor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._connection = duckdb.connect(self.database, read_only=True)
+                self._pid = os.getpid()
+                self._local = threading.local()
+            local = self._local
+        cursor = getattr(local, 'cursor', None)
+        if cursor is None:
+            cursor = local.cursor = self._connection.cursor()
+        return cursor
+
+    # Parametrisierte Abfrage; DuckDB bereitet die Anweisung vor und bindet die Werte an $1, $2, ...
+    def df(self, query, params=()):
+        return self.cursor().execute(query, list(params)).df()
+
+
+# 'Alle' wird als NULL gebunden; die Bedingungen lauten "($n IS NULL OR spalte = $n)"
+def _param(value):
+    return None if value == ALL else value
+
+
+def _month_name(month):
+    return None if month == ALL else MONTHS[int(month) - 1]
+
+
+# Wie in den Zusammenfassungen fallen Zeilen ohne Airline-Namen oder Stornogrund weg
+CANCELLATION_FILTER = """
+WHERE "cancellation_reason" IS NOT NULL
+  AND "airline" IS NOT NULL
+  AND ($1 IS NULL OR "airline" = $1)
+  AND ($2 IS NULL OR "cancellation_reason" = $2)
+  AND ($3 IS NULL OR "year" = $3)
+  AND ($4 IS NULL OR "month" = $4)
+"""
+
+# Abfragen je Aufschlüsselung; "by" wird nur aus dieser festen Liste gewählt
+CANCELLATION_BREAKDOWNS = {
+    by: f"""
+SELECT {', '.join(f'"{column}"' for column in by)}, CAST(SUM("cancellations") AS BIGINT) AS "cancellations"
+FROM agg_cancellations
+{CANCELLATION_FILTER}
+GROUP BY {', '.join(f'"{column}"' for column in by)}
+ORDER BY {', '.join(f'"{column}"' for column in by)}
+"""
+    for by in (('airline',), ('cancellation_reason',), ('cancellation_reason', 'airline'), ('year',))
+}
+
+AIRLINES = f"""
+SELECT
+    "airline",
+    "month_int" AS "month",
+    "month_int",
+    "year",
+    CAST(SUM("total_flights") AS BIGINT) AS "total_flights",
+    SUM("percent of arrivals on time") AS "percent of arrivals on time",
+    SUM("percent of departures on time") AS "percent of departures on time",
+    SUM("cancellation_rate_percent") AS "cancellation_rate_percent"
+FROM agg_airlines_metrics
+WHERE "airline" IS NOT NULL
+  AND ($1 IS NULL OR "airline" = $1)
+  AND ($2 IS NULL OR "year" = $2)
+  AND ($3 IS NULL OR "month_int" = $3)
+GROUP BY "airline", "month_int", "year"
+ORDER BY "airline", "year", "month_int"
+"""
+
+CANCELLATIONS_SUMMARY = f"""
+SELECT
+    "cancellation_reason",
+    "airline",
+    "year",
+    {MONTH_NUMBER.format(column='"month"')} AS "month",
+    CAST(SUM("cancellations") AS BIGINT) AS "cancellations",
+    SUM("cancellations") / SUM(SUM("cancellations")) OVER () * 100 AS "percentage"
+FROM agg_cancellations
+WHERE "cancellation_reason" IS NOT NULL
+  AND "airline" IS NOT NULL
+GROUP BY ALL
+"""
+
+
+class LiveCube:
+    """Gleiche Schnittstelle wie FilterCube, beantwortet aber jede Auswahl mit einer Abfrage auf DuckDB."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.years = self.cancellations('year').index.tolist()
+
+    def cancellations(self, by, airline=ALL, reason=ALL, year=ALL, month=ALL):
+        by = (by,) if isinstance(by, str) else tuple(by)
+        params = (_param(airline), _param(reason), _param(year), _month_name(month))
+        result = self.pool.df(CANCELLATION_BREAKDOWNS[by], params)
+        return result.set_index(list(by))['cancellations']
+
+    def airlines(self, airline=ALL, year=ALL, month=ALL):
+        return self.pool.df(AIRLINES, (_param(airline), _param(year), _param(month)))
+
+    # Zusammenfassungen wie im Datenspeicher, direkt aus den Aggregat-Tabellen
+    def summaries(self):
+        cancellations = apply_schema(self.pool.df(CANCELLATIONS_SUMMARY), 'cancellations_summary')
+        airlines = apply_schema(self.airlines(), 'airliness_summary')
+        return share_dictionaries([cancellations, airlines])
+
+
+# Schlüssel = airport_id der Tabelle "airports"; Lücken werden mit leeren Zeilen aufgefüllt
+AIRPORTS = """
+SELECT "airport_id", "iata_code" AS "airport", "city", "latitude" AS "lat", "longitude" AS "lon"
+FROM airports
+ORDER BY "airport_id"
+"""
+
+# Verbindungen je Route, Jahr und Monat mit den Schlüsseln der Tabelle "airports";
+# wie im RouteDataset ohne Flughäfen, denen Stadt oder Koordinaten fehlen
+ROUTE_CONNECTIONS = f"""
+WITH connections AS (
+    SELECT
+        o."airport_id" AS "origin_key",
+        d."airport_id" AS "destination_key",
+        o."city" AS "origin_city",
+        d."city" AS "destination_city",
+        r."year",
+        {MONTH_NUMBER.format(column='r."month"')} AS "month",
+        r."count(flight_id)" AS "total_flights"
+    FROM agg_flight_routes r
+    JOIN airports o ON o."iata_code" = r."origin_airport"
+    JOIN airports d ON d."iata_code" = r."destination_airport"
+    WHERE o."city" IS NOT NULL AND isfinite(o."latitude") AND isfinite(o."longitude")
+      AND d."city" IS NOT NULL AND isfinite(d."latitude") AND isfinite(d."longitude")
+)
+"""
+
+ROUTE_FILTER = ROUTE_CONNECTIONS + """
+SELECT "origin_key", "destination_key", "year", "month", CAST(SUM("total_flights") AS INTEGER) AS "total_flights"
+FROM connections
+WHERE "year" = $1
+  AND ($2 IS NULL OR "origin_city" = $2)
+  AND ($3 IS NULL OR "destination_city" = $3)
+GROUP BY "origin_key", "destination_key", "year", "month"
+"""
+
+ROUTE_RANGE = ROUTE_CONNECTIONS + """
+SELECT MIN("total_flights"), MAX("total_flights")
+FROM (
+    SELECT SUM("total_flights") AS "total_flights"
+    FROM connections
+    GROUP BY "origin_key", "destination_key", "year", "month"
+)
+"""
+
+ROUTE_TOP_ORIGINS = ROUTE_CONNECTIONS + """
+SELECT "origin_key", CAST(SUM("total_flights") AS BIGINT) AS "total_flights"
+FROM connections
+GROUP BY "origin_key"
+ORDER BY "total_flights" DESC
+LIMIT $1
+"""
+
+ROUTE_YEARS = """
+SELECT DISTINCT "year" FROM agg_flight_routes ORDER BY "year"
+"""
+
+
+class LiveRouteDataset(RouteDataset):
+    """Gleiche Schnittstelle wie RouteDataset; die Verbindungen werden je Auswahl aus DuckDB gelesen."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        airports = pool.df(AIRPORTS).set_index('airport_id')
+        airports = airports.reindex(pd.RangeIndex(airports.index.max() + 1))
+        self._index_airports(airports.astype({'airport': 'category', 'city': 'category'}).reset_index(drop=True))
+        self.years = pool.df(ROUTE_YEARS)['year'].tolist()
+
+    @property
+    def connections(self):
+        raise AttributeError("LiveRouteDataset hält keine Verbindungen im Speicher, siehe filter()")
+
+    def filter(self, year, origin='all', destination='all'):
+        params = (int(year), None if origin == 'all' else origin, None if destination == 'all' else destination)
+        return self.pool.df(ROUTE_FILTER, params)
+
+    def flight_range(self):
+        return tuple(self.pool.cursor().execute(ROUTE_RANGE).fetchone())
+
+    def top_origins(self, n):
+        top = self.pool.df(ROUTE_TOP_ORIGINS, (int(n),))
+        return self.with_coordinates(self.with_cities(top, ['origin']), ['origin'])
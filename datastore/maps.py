@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import os
+import threading
+from pathlib import Path
+from urllib.parse import urlencode
+
+from flask import Blueprint, Response, abort, request
+
+from .cache import code_version, version_dir
+from .store import DATA_DIR
+
+
+# Verzeichnis der fertig gerenderten, gzip-komprimierten Karten; von allen Workern gemeinsam genutzt
+MAP_DIR = Path(os.environ.get('FLIGHTS_MAP_DIR', DATA_DIR / '.cache' / 'maps'))
+
+maps_blueprint = Blueprint('maps', __name__)
+
+_stores = {}
+
+
+class MapStore:
+    """Rendert eine Karte je Parameterkombination einmal und liefert sie komprimiert per URL aus.
+
+    render(**params) erhält die Parameter als Strings und gibt HTML zurück; bei
+    ungültigen Parametern wirft es KeyError oder ValueError (Antwort 404).
+    """
+
+    def __init__(self, name, render, version, directory=MAP_DIR):
+        self.name = name
+        self.render = render
+        self.version = f"{version}-{code_version(render)}"
+        self.directory = version_dir(Path(directory) / name, self.version)
+        _stores[name] = self
+
+    @staticmethod
+    def _params(params):
+        return {key: str(value) for key, value in sorted(params.items())}
+
+    def path(self, params):
+        key = hashlib.sha1(urlencode(self._params(params)).encode()).hexdigest()[:20]
+        return self.directory / f"{key}.html.gz"
+
+    # Adresse für das src-Attribut eines Iframes; die Version macht sie unveränderlich
+    def url(self, **params):
+        return f"/maps/{self.name}/{self.version}?{urlencode(self._params(params))}"
+
+    def get(self, **params):
+        params = self._params(params)
+        path = self.path(params)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            pass
+        data = gzip.compress(self.render(**params).encode('utf-8'), compresslevel=6)
+        # Das Verzeichnis kann inzwischen von einem anderen Worker aufgeräumt worden sein
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    # Rendert die angegebenen Karten im Hintergrund vor, damit schon der erste Aufruf aus dem Cache kommt
+    def prerender(self, param_sets):
+        def run():
+            for params in param_sets:
+                self.get(**params)
+
+        thread = threading.Thread(target=run, name=f"prerender-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+
+@maps_blueprint.route('/maps/<name>/<version>')
+def serve_map(name, version):
+    store = _stores.get(name)
+    if store is None or store.version != version:
+        abort(404)
+    try:
+        data = store.get(**request.args.to_dict())
+    except (KeyError, ValueError):
+        abort(404)
+    headers = {'Cache-Control': 'public, max-age=31536000, immutable', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(data, mimetype='text/html', headers=headers)
+    return Response(gzip.decompress(data), mimetype='text/html', headers=headers)
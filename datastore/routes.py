@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from .cache import code_version, version_dir
+from .shared import shared_dir, shared_frames
+from .store import data_version, load_summary
+
+
+ENDPOINTS = ('origin', 'destination')
+
+
+class RouteDataset:
+    """Flugbewegungen je Route, Jahr und Monat mit ganzzahligen Flughafen-Schlüsseln.
+
+    airports: ein Eintrag je Flughafen (Schlüssel = Index) mit Stadt und Koordinaten
+    connections: origin_key, destination_key, year, month, total_flights
+
+    Flughäfen ohne Stadt oder ohne gültige Koordinaten (z.B. Codes, die in airports.csv fehlen)
+    werden wie bisher beim groupby über Stadt und Koordinaten samt ihren Routen weggelassen.
+    """
+
+    def __init__(self, airports, connections):
+        self.connections = connections
+        self.years = sorted(connections['year'].unique().tolist())
+        self._index_airports(airports)
+
+    # Nachschlagetabellen; der Schlüssel eines Flughafens ist seine Position in "airports"
+    def _index_airports(self, airports):
+        self.airports = airports
+        self._lat = airports['lat'].to_numpy()
+        self._lon = airports['lon'].to_numpy()
+        self._city_codes = airports['city'].cat.codes.to_numpy()
+        self._cities = airports['city'].cat.categories
+        self._city_keys = {city: keys for city, keys in airports.groupby('city', observed=True).indices.items()}
+
+    @classmethod
+    def build(cls, routes):
+        endpoints = []
+        for endpoint in ENDPOINTS:
+            columns = [f'{endpoint}_airport', f'{endpoint}_city', f'{endpoint}_airport_lat', f'{endpoint}_airport_lon']
+            frame = routes[columns].drop_duplicates(f'{endpoint}_airport')
+            frame.columns = ['airport', 'city', 'lat', 'lon']
+            located = frame['city'].notna() & np.isfinite(frame[['lat', 'lon']].to_numpy(dtype='float64')).all(axis=1)
+            endpoints.append(frame[located].astype({'airport': str, 'city': str}))
+        airports = pd.concat(endpoints).drop_duplicates('airport').sort_values('airport').reset_index(drop=True)
+        # Wörterbücher der Zusammenfassung beibehalten
+        airports = airports.astype({'airport': routes['origin_airport'].dtype, 'city': routes['origin_city'].dtype})
+
+        airport_index = pd.Index(airports['airport'].astype(str))
+        connections = pd.DataFrame({
+            'origin_key': airport_index.get_indexer(routes['origin_airport'].astype(str)).astype('int16'),
+            'destination_key': airport_index.get_indexer(routes['destination_airport'].astype(str)).astype('int16'),
+            'year': routes['year'].to_numpy(),
+            'month': routes['month'],
+            'total_flights': routes['count(flight_id)'].to_numpy(),
+        })
+        # -1 = Start oder Ziel ohne Stadt/Koordinaten
+        connections = connections[(connections['origin_key'] >= 0) & (connections['destination_key'] >= 0)]
+        connections = connections.groupby(['origin_key', 'destination_key', 'year', 'month'], as_index=False, observed=True)['total_flights'].sum()
+        connections['total_flights'] = connections['total_flights'].astype('int32')
+        return cls(airports, connections)
+
+    def city_keys(self, city):
+        return self._city_keys.get(city, np.empty(0, dtype='int64'))
+
+    # Verbindungen eines Jahres, optional auf Start- und Zielstadt eingeschränkt ('all' = alle)
+    def filter(self, year, origin='all', destination='all'):
+        connections = self.connections
+        mask = connections['year'].to_numpy() == year
+        if origin != 'all':
+            mask &= np.isin(connections['origin_key'].to_numpy(), self.city_keys(origin))
+        if destination != 'all':
+            mask &= np.isin(connections['destination_key'].to_numpy(), self.city_keys(destination))
+        return connections[mask]
+
+    # Kleinste und größte Anzahl Flüge einer Route in einem Monat (für die Skalierung der Linien)
+    def flight_range(self):
+        return self.connections['total_flights'].min(), self.connections['total_flights'].max()
+
+    # Startflughäfen mit den meisten Flügen über alle Jahre, mit Stadt und Koordinaten
+    def top_origins(self, n):
+        top = self.connections.groupby('origin_key', as_index=False)['total_flights'].sum().nlargest(n, 'total_flights')
+        return self.with_coordinates(self.with_cities(top, ['origin']), ['origin'])
+
+    # Städte (kategorial) zu den Schlüsseln ergänzen
+    def with_cities(self, df, endpoints=ENDPOINTS):
+        columns = {
+            f'{endpoint}_city': pd.Categorical.from_codes(self._city_codes[df[f'{endpoint}_key'].to_numpy()], self._cities)
+            for endpoint in endpoints
+        }
+        return df.assign(**columns)
+
+    # Koordinaten aus der Flughafen-Tabelle zu den Schlüsseln ergänzen
+    def with_coordinates(self, df, endpoints=ENDPOINTS):
+        columns = {}
+        for endpoint in endpoints:
+            keys = df[f'{endpoint}_key'].to_numpy()
+            columns[f'{endpoint}_airport_lat'] = self._lat[keys]
+            columns[f'{endpoint}_airport_lon'] = self._lon[keys]
+        return df.assign(**columns)
+
+
+def _build_frames(data_dir):
+    dataset = RouteDataset.build(load_summary('flight_routes_summary', data_dir))
+    return [dataset.airports, dataset.connections]
+
+
+# Lädt den Routen-Datensatz der aktuellen Datenversion; der erste Worker baut ihn,
+# alle weiteren blenden die gespeicherten Arrow-Dateien nur noch ein
+def load_route_dataset(data_dir=None):
+    version = f"{data_version(['flight_routes_summary'], data_dir)}-{code_version(RouteDataset)}"
+    directory = version_dir(shared_dir(data_dir) / 'routes', version)
+    airports, connections = shared_frames(directory, ['airports', 'connections'], lambda: _build_frames(data_dir))
+    return RouteDataset(airports, connections)
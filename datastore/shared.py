@@ -0,0 +1,78 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import pyarrow as pa
+
+from .cache import code_version, version_dir
+from .store import DATA_DIR, data_version, load_summaries
+
+
+# Aufbereitete Daten als unkomprimierte Arrow-IPC-Dateien; alle Worker blenden dieselbe Datei
+# per mmap ein. Geteilt werden damit nur die Zahlenspalten ohne fehlende Werte (siehe read_ipc),
+# alle übrigen Spalten legt jeder Worker beim Einlesen als eigene Kopie an.
+SHARED_DIR = DATA_DIR / '.cache' / 'shared'
+
+
+# Gemeinsames Verzeichnis zu einem Datenverzeichnis; jedes Datenverzeichnis hat seinen eigenen Cache
+def shared_dir(data_dir=None):
+    return Path(data_dir) / '.cache' / 'shared' if data_dir else SHARED_DIR
+
+
+def write_ipc(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+# Blendet eine Arrow-IPC-Datei ein. Nur Zahlenspalten ohne fehlende Werte verweisen ohne Kopie auf
+# die Datei; Kategorien (Codes und Wörterbuch), Texte und Spalten mit fehlenden Werten wandelt
+# pandas in eigene Arrays um, sie belegen also in jedem Worker Speicher (bei Kategorien nur die Codes).
+def read_ipc(path):
+    source = pa.memory_map(str(path), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+# Sperrt das Verzeichnis für andere Prozesse, solange die Dateien gebaut werden; die Sperre
+# endet auch, wenn der Prozess abstürzt. Ohne fcntl (Windows) baut im Zweifel jeder Prozess selbst.
+@contextmanager
+def build_lock(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(directory / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# Liefert die Frames aus dem gemeinsamen Verzeichnis; build() wird nur aufgerufen, wenn sie fehlen.
+# Starten mehrere Worker gleichzeitig, baut einer, die anderen warten und lesen danach seine Dateien.
+def shared_frames(directory, names, build):
+    paths = [directory / f"{name}.arrow" for name in names]
+    if not all(path.exists() for path in paths):
+        directory.mkdir(parents=True, exist_ok=True)
+        with build_lock(directory):
+            if not all(path.exists() for path in paths):
+                for path, df in zip(paths, build()):
+                    write_ipc(df, path)
+    return [read_ipc(path) for path in paths]
+
+
+# Wie load_summaries, aber einmal je Datenversion aufbereitet und von allen Workern gemeinsam eingeblendet
+def load_shared_summaries(*names, data_dir=None):
+    version = f"{data_version(names, data_dir)}-{code_version(load_summaries)}"
+    directory = version_dir(shared_dir(data_dir) / '+'.join(names), version)
+    return shared_frames(directory, names, lambda: load_summaries(*names, data_dir=data_dir))
@@ -0,0 +1,183 @@
+import filecmp
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+
+# Basisverzeichnis des Repos, dort liegen auch die bisherigen CSV-Exporte
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Verzeichnis des lokalen Spaltenspeichers; über die Umgebungsvariable FLIGHTS_DATA_DIR konfigurierbar
+DATA_DIR = Path(os.environ.get('FLIGHTS_DATA_DIR', BASE_DIR))
+
+# Letzter Ausweg, falls weder Parquet-Datei noch lokale CSV vorhanden ist; nur mit FLIGHTS_REMOTE_DATA=1.
+# Ohne diese Angabe bleibt das Laden lokal, fehlende Daten führen zu einem FileNotFoundError.
+REMOTE_URL = "https://media.githubusercontent.com/media/swrobuts/Flights/main/{name}.csv"
+REMOTE_DATA = os.environ.get('FLIGHTS_REMOTE_DATA') == '1'
+
+# Monatsnamen der Rohdaten; im Speicher wird der Monat als Zahl (int8) gehalten
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Spaltentypen der Zusammenfassungen; Texte werden als Kategorien (Dictionary-Encoding) gehalten
+SCHEMAS = {
+    'cancellations_summary': {
+        'cancellation_reason': 'category',
+        'airline': 'category',
+        'year': 'int16',
+        'month': 'int8',
+        'cancellations': 'int32',
+        'percentage': 'float64',
+    },
+    'airliness_summary': {
+        'airline': 'category',
+        'month': 'int8',
+        'month_int': 'int8',
+        'year': 'int16',
+        'total_flights': 'int32',
+        'percent of arrivals on time': 'float64',
+        'percent of departures on time': 'float64',
+        'cancellation_rate_percent': 'float64',
+    },
+    'flight_routes_summary': {
+        'origin_airport': 'category',
+        'destination_airport': 'category',
+        'origin_city': 'category',
+        'destination_city': 'category',
+        'origin_airport_lon': 'float64',
+        'origin_airport_lat': 'float64',
+        'destination_airport_lon': 'float64',
+        'destination_airport_lat': 'float64',
+        'year': 'int16',
+        'month': 'int8',
+        'count(flight_id)': 'int32',
+        'round(sum(distance_km), 0)': 'float64',
+        'avg_distance_km': 'float64',
+    },
+}
+
+
+# Spalten, die sich ein gemeinsames Wörterbuch der Kategorien teilen (auch über Zusammenfassungen hinweg)
+SHARED_DICTIONARIES = {
+    'airline': ['airline'],
+    'cancellation_reason': ['cancellation_reason'],
+    'airport': ['origin_airport', 'destination_airport'],
+    'city': ['origin_city', 'destination_city'],
+}
+
+
+def store_path(name, data_dir=None):
+    return Path(data_dir or DATA_DIR) / f"{name}.parquet"
+
+
+# Git-LFS-Zeiger sind keine echten CSV-Dateien (z.B. bei einem Checkout ohne "git lfs pull")
+def _is_lfs_pointer(path):
+    with open(path, 'rb') as f:
+        return f.read(24).startswith(b'version https://git-lfs')
+
+
+def _csv_source(name, data_dir):
+    directories = list(dict.fromkeys([Path(data_dir), BASE_DIR]))
+    for directory in directories:
+        path = directory / f"{name}.csv"
+        if path.exists() and not _is_lfs_pointer(path):
+            return path
+    if REMOTE_DATA:
+        return REMOTE_URL.format(name=name)
+    raise FileNotFoundError(
+        f"Keine Daten für {name}: weder {store_path(name, data_dir)} noch {name}.csv in "
+        f"{', '.join(map(str, directories))}. Mit 'python -m etl' erzeugen oder FLIGHTS_REMOTE_DATA=1 setzen."
+    )
+
+
+# Monatsnamen ("Jan") in Monatszahlen umwandeln; bereits numerische Monate bleiben unverändert
+def month_numbers(month):
+    if pd.api.types.is_numeric_dtype(month):
+        return month.astype('int8')
+    numbers = {name: number for number, name in enumerate(MONTHS, start=1)}
+    return month.astype(str).map(numbers).astype('int8')
+
+
+def apply_schema(df, name):
+    if 'month' in df.columns:
+        df = df.assign(month=month_numbers(df['month']))
+    schema = {col: dtype for col, dtype in SCHEMAS.get(name, {}).items() if col in df.columns}
+    return df.astype(schema)
+
+
+# Vereinheitlicht die Kategorien zusammengehöriger Spalten, damit gleiche Werte gleiche Codes haben
+def share_dictionaries(frames):
+    for columns in SHARED_DICTIONARIES.values():
+        present = [(df, col) for df in frames for col in columns if col in df.columns]
+        if not present:
+            continue
+        categories = set()
+        for df, col in present:
+            categories.update(df[col].astype('category').cat.categories)
+        dtype = pd.CategoricalDtype(sorted(categories))
+        for df, col in present:
+            df[col] = df[col].astype(dtype)
+    return frames
+
+
+def read_summary_csv(name, data_dir=None):
+    source = _csv_source(name, data_dir or DATA_DIR)
+    # Monatsnamen zunächst als Kategorie einlesen, apply_schema wandelt sie in Zahlen um
+    schema = {**SCHEMAS.get(name, {}), 'month': 'category'}
+    return apply_schema(pd.read_csv(source, dtype=schema), name)
+
+
+def _load(name, data_dir):
+    path = store_path(name, data_dir)
+    if path.exists():
+        return apply_schema(pd.read_parquet(path), name)
+    return read_summary_csv(name, data_dir)
+
+
+# Lädt eine Zusammenfassung aus dem Parquet-Speicher; CSV nur, wenn der Speicher fehlt
+def load_summary(name, data_dir=None):
+    return share_dictionaries([_load(name, data_dir)])[0]
+
+
+# Lädt mehrere Zusammenfassungen mit gemeinsamen Wörterbüchern (z.B. dieselben Codes für "airline")
+def load_summaries(*names, data_dir=None):
+    return share_dictionaries([_load(name, data_dir) for name in names])
+
+
+# Kennung des Datenstands der Zusammenfassungen (Größe und Änderungszeit der Dateien);
+# ändert sich, sobald die Pipeline neue Dateien schreibt
+def data_version(names, data_dir=None):
+    parts = []
+    for name in names:
+        path = store_path(name, data_dir)
+        if not path.exists():
+            path = _csv_source(name, data_dir or DATA_DIR)
+        if isinstance(path, Path):
+            stat = path.stat()
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+        else:
+            parts.append(f"{name}:{path}")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+# Schreibt eine Zusammenfassung typisiert und zstd-komprimiert in den Parquet-Speicher.
+# Ist der Inhalt unverändert, bleibt die alte Datei stehen und mit ihr die Datenversion.
+def write_summary(df, name, data_dir=None):
+    path = store_path(name, data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.parquet.tmp')
+    apply_schema(df, name).to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+    if path.exists() and filecmp.cmp(tmp_path, path, shallow=False):
+        tmp_path.unlink()
+    else:
+        os.replace(tmp_path, path)
+    return path
+
+
+# Baut den Parquet-Speicher aus den vorhandenen CSV-Exporten auf
+def build_store(data_dir=None, names=None):
+    paths = []
+    for name in names or SCHEMAS:
+        paths.append(write_summary(read_summary_csv(name, data_dir), name, data_dir))
+    return paths
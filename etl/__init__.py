@@ -0,0 +1,2 @@
+from .config import PipelineConfig
+from .pipeline import run_pipeline
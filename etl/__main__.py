@@ -0,0 +1,50 @@
+import argparse
+import logging
+
+from .config import PipelineConfig
+from .pipeline import run_pipeline
+
+
+# Aufruf: python -m etl [--database flights.duckdb] [--raw-dir .] [--years 2014 2015] ...
+def main(argv=None):
+    defaults = PipelineConfig()
+    parser = argparse.ArgumentParser(description="Baut die Zusammenfassungen der Dash-Seiten aus den Jahresdateien neu auf.")
+    parser.add_argument('--database', default=str(defaults.database), help="persistente DuckDB-Datei")
+    parser.add_argument('--raw-dir', default=str(defaults.raw_dir), help="Verzeichnis mit 2014.csv, 2015.csv, airports.csv, airlines.csv")
+    parser.add_argument('--output-dir', default=str(defaults.output_dir), help="Zielverzeichnis des Datenspeichers")
+    parser.add_argument('--years', nargs='*', type=int, default=[], help="nur diese Jahre laden (Standard: alle)")
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None, help="gleichzeitige Aggregate und pandas-Prozesse; 1 = nacheinander (Standard: Kerne, höchstens 4; mit --memory-limit 1)")
+    parser.add_argument('--memory-limit', default=None, help="z.B. 4GB; darüber lagert DuckDB in das Auslagerungsverzeichnis aus")
+    parser.add_argument('--temp-dir', default=None, help="Auslagerungsverzeichnis (Standard: <database>.tmp)")
+    parser.add_argument('--csv', action='store_true', help="zusätzlich CSV-Dateien schreiben")
+    parser.add_argument('--full-refresh', action='store_true', help="alle Jahre verwerfen und neu laden")
+    parser.add_argument('--materialize', action='store_true', help="Analyse-Views als Tabellen mv_* speichern")
+    parser.add_argument('--facts', action='store_true', help="Flugdaten als Parquet-Datensatz je Jahr/Monat exportieren")
+    parser.add_argument('--facts-dir', default=None, help="Zielverzeichnis des Parquet-Datensatzes (Standard: <output-dir>/facts)")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s %(levelname)s %(message)s'
+    )
+    run_pipeline(PipelineConfig(
+        database=args.database,
+        raw_dir=args.raw_dir,
+        output_dir=args.output_dir,
+        years=args.years,
+        threads=args.threads,
+        memory_limit=args.memory_limit,
+        workers=args.workers,
+        temp_directory=args.temp_dir,
+        write_csv=args.csv,
+        full_refresh=args.full_refresh,
+        materialize=args.materialize,
+        export_facts=args.facts,
+        facts_dir=args.facts_dir,
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from datastore import DATA_DIR
+
+
+# Obergrenze für die voreingestellte Anzahl gleichzeitiger Schritte; jeder Schritt belegt eigenen Speicher
+DEFAULT_WORKERS = 4
+
+
+# Jahresdateien der BTS-Daten heißen wie das Jahr, z.B. "2014.csv"
+YEAR_FILE = re.compile(r'^(\d{4})\.csv$')
+
+
+@dataclass
+class PipelineConfig:
+    # Persistente DuckDB-Datei statt ':memory:'
+    database: Path = DATA_DIR / 'flights.duckdb'
+    # Verzeichnis mit den Rohdaten (Jahresdateien, airports.csv, airlines.csv)
+    raw_dir: Path = DATA_DIR
+    # Zielverzeichnis für die Zusammenfassungen der Dash-Seiten
+    output_dir: Path = DATA_DIR
+    # Zu ladende Jahre; leer = alle Jahresdateien im raw_dir
+    years: list = field(default_factory=list)
+    # DuckDB-Einstellungen, None = Vorgabe von DuckDB
+    threads: int = None
+    memory_limit: str = None
+    # Gleichzeitige Abfragen bzw. Prozesse für die pandas-Stufen; 1 = alles nacheinander.
+    # None = Anzahl der Kerne, höchstens DEFAULT_WORKERS; mit Speicherlimit nacheinander
+    workers: int = None
+    # Auslagerungsverzeichnis, wenn das Speicherlimit erreicht ist; None = "<database>.tmp"
+    temp_directory: Path = None
+    # Zusätzlich CSV-Dateien neben den Parquet-Dateien schreiben
+    write_csv: bool = False
+    # Alle Tabellen verwerfen und sämtliche Jahre neu laden
+    full_refresh: bool = False
+    # Analyse-Views zusätzlich als Tabellen (mv_*) speichern
+    materialize: bool = False
+    # vw_OneBigTable als nach Jahr und Monat partitionierten Parquet-Datensatz exportieren
+    export_facts: bool = False
+    facts_dir: Path = None
+
+    def __post_init__(self):
+        self.database = Path(self.database)
+        self.raw_dir = Path(self.raw_dir)
+        self.output_dir = Path(self.output_dir)
+        if not self.workers:
+            self.workers = 1 if self.memory_limit else min(DEFAULT_WORKERS, os.cpu_count() or 1)
+        self.temp_directory = Path(self.temp_directory) if self.temp_directory else None
+        self.facts_dir = Path(self.facts_dir) if self.facts_dir else self.output_dir / 'facts'
+
+    def year_files(self):
+        files = {}
+        for path in sorted(self.raw_dir.glob('*.csv')):
+            match = YEAR_FILE.match(path.name)
+            if match:
+                files[int(match.group(1))] = path
+        if self.years:
+            missing = [year for year in self.years if year not in files]
+            if missing:
+                raise FileNotFoundError(f"Keine Rohdaten für {missing} in {self.raw_dir}")
+            files = {year: files[year] for year in self.years}
+        return files
@@ -0,0 +1,443 @@
+import hashlib
+import logging
+import multiprocessing
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import repeat
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import duckdb
+import pandas as pd
+
+from datastore import DATA_DIR, prune_versions, store_path, write_summary
+from datastore.cache import CACHE_DIR
+from datastore.maps import MAP_DIR
+from datastore.shared import shared_dir
+from . import sql
+
+
+logger = logging.getLogger(__name__)
+
+
+# Protokolliert die Laufzeit einer Stufe der Pipeline
+@contextmanager
+def stage(name):
+    logger.info("%s ...", name)
+    start = time.perf_counter()
+    yield
+    logger.info("%s: %.1f s", name, time.perf_counter() - start)
+
+
+# Puffergröße von read_csv_auto beim Laden mit Speicherlimit; ohne Angabe richtet DuckDB die
+# Puffer nach der Dateigröße aus, bei großen Jahresdateien reichen sie allein an ein knappes Limit heran
+CSV_BUFFER_SIZE = 8 * 1024 ** 2
+
+
+# Dateipfad als SQL-Stringliteral
+def sql_path(path):
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+# Führt unabhängige Aufgaben gleichzeitig aus, jede mit einem eigenen Cursor derselben Datenbank;
+# DuckDB bearbeitet die Abfragen verschiedener Cursor parallel. Eine Aufgabe ist task(cursor).
+def run_concurrently(conn, tasks, workers):
+    if workers <= 1 or len(tasks) <= 1:
+        return [task(conn) for task in tasks]
+    cursors = [conn.cursor() for _ in tasks]
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda task, cursor: task(cursor), tasks, cursors))
+    finally:
+        for cursor in cursors:
+            cursor.close()
+
+
+# Prozesse für die pandas-Stufen (None = im eigenen Prozess rechnen). "spawn" statt fork,
+# damit die Kindprozesse nichts von der offenen DuckDB-Verbindung und ihren Threads erben.
+@contextmanager
+def process_pool(workers):
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        yield executor
+
+
+# Höchster Speicherverbrauch in MB als (eigener Prozess inkl. DuckDB, größter beendeter Kindprozess);
+# die pandas-Stufen rechnen im Prozess-Pool, ihr Verbrauch zählt nur beim Kindprozess.
+# ru_maxrss ist unter Linux in KB, unter macOS in Byte.
+def peak_memory_mb():
+    if resource is None:
+        return None
+    scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+    return tuple(resource.getrusage(who).ru_maxrss / scale for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+
+
+# Verbindung zur persistenten DuckDB-Datei mit konfigurierten Threads und Speicherlimit.
+# Mit Speicherlimit werden die Jahresdateien gestreamt gelesen; Sortierung, Joins und Aggregate,
+# die nicht mehr in den Speicher passen, lagert DuckDB in das Auslagerungsverzeichnis aus.
+# Ohne feste Reihenfolge (außer bei ORDER BY) muss DuckDB keine Zwischenergebnisse puffern.
+def connect(config):
+    config.database.parent.mkdir(parents=True, exist_ok=True)
+    conn = duckdb.connect(str(config.database))
+    if config.threads:
+        conn.execute(f"SET threads = {int(config.threads)};")
+    if config.memory_limit:
+        conn.execute(f"SET memory_limit = {sql_path(config.memory_limit)};")
+        conn.execute("SET preserve_insertion_order = false;")
+    if config.temp_directory:
+        config.temp_directory.mkdir(parents=True, exist_ok=True)
+        conn.execute(f"SET temp_directory = {sql_path(config.temp_directory)};")
+    return conn
+
+
+def load_dimensions(conn, config):
+    conn.execute(sql.AIRPORTS.format(airports_csv=sql_path(config.raw_dir / 'airports.csv')))
+    conn.execute(sql.AIRLINES.format(airlines_csv=sql_path(config.raw_dir / 'airlines.csv')))
+    conn.execute(sql.CANCELLATION_REASONS)
+
+
+# Kennung der Aggregat-Tabellen und Views: ihr SQL und der Inhalt der Stammdaten, aus denen sie
+# Namen, Städte und Koordinaten übernehmen. Ändert sie sich (neue Programmversion, geänderte
+# airports.csv oder airlines.csv), werden Aggregate und materialisierte Views neu aufgebaut.
+def definition_fingerprint(config):
+    digest = hashlib.sha1()
+    statements = [*sql.BASE_VIEWS, *sql.AGGREGATES.values(), *sql.VIEWS, sql.MATERIALIZE]
+    statements += [f"{table}:{view}" for table, view in sql.MATERIALIZED_VIEWS.items()]
+    for statement in statements:
+        digest.update(statement.encode())
+    for name in ('airports.csv', 'airlines.csv'):
+        digest.update((config.raw_dir / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Tabellen, Aggregat-Tabellen und Views anlegen, soweit noch nicht vorhanden; Aggregat-Tabellen
+# mit anderer Definition werden verworfen. Gibt die neu angelegten Aggregat-Tabellen zurück.
+def ensure_schema(conn, definition):
+    conn.execute(sql.FLIGHTS_TABLE)
+    for statement in sql.BASE_VIEWS:
+        conn.execute(statement)
+    conn.execute(sql.MATERIALIZATIONS)
+    existing = {name for (name,) in conn.execute("SELECT table_name FROM information_schema.tables;").fetchall()}
+    built = built_state(conn)
+    created = [table for table in sql.AGGREGATES if table not in existing or built.get(table, (None, None))[1] != definition]
+    for table in created:
+        if table in existing:
+            logger.info("%s: SQL oder Stammdaten geändert, wird neu aufgebaut", table)
+            conn.execute(sql.DROP_AGGREGATE.format(table=table))
+    for table, select in sql.AGGREGATES.items():
+        conn.execute(sql.CREATE_AGGREGATE.format(table=table, select=select.format(year='NULL')))
+    for statement in sql.VIEWS:
+        conn.execute(statement)
+    return created
+
+
+# Datenbanken aus älteren Läufen (Uhrzeiten als VARCHAR, breite Tabelle flights ohne
+# Schlüssel der Dimensionen) müssen einmal vollständig neu aufgebaut werden
+def outdated_schema(conn):
+    columns = dict(conn.execute(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = 'flights';"
+    ).fetchall())
+    return bool(columns) and (columns.get('scheduled_departure') != 'TIME' or 'origin_airport_id' not in columns)
+
+
+# Größe und Änderungszeit der Quelldatei kennzeichnen den Stand einer Partition
+def partition_fingerprint(path):
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+# Jahresdateien, die neu sind oder sich seit dem letzten Laden geändert haben
+def pending_partitions(conn, config):
+    loaded = {
+        year: (file_size, file_mtime_ns)
+        for year, file_size, file_mtime_ns in conn.execute('SELECT "year", "file_size", "file_mtime_ns" FROM ingested_partitions;').fetchall()
+    }
+    return {
+        year: path
+        for year, path in config.year_files().items()
+        if loaded.get(year) != partition_fingerprint(path)
+    }
+
+
+# Die Attribute der Dimensionen werden nicht mehr in die Faktentabelle kopiert;
+# je Partition wird nur die Zeit-Dimension fortgeschrieben
+def prepare_partition(conn, year):
+    with stage("Zeit-Dimension"):
+        conn.execute(sql.TIME_DIMENSION.format(year=year))
+
+
+def merge_aggregate(conn, table, year):
+    with stage(f"Aggregat {table}"):
+        conn.execute("BEGIN TRANSACTION;")
+        try:
+            conn.execute(sql.MERGE_AGGREGATE.format(table=table, year=year, select=sql.AGGREGATES[table].format(year=year)))
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+
+# Ersetzt die Partition in den Aggregat-Tabellen, ohne die übrigen Jahre neu zu berechnen;
+# die Tabellen sind voneinander unabhängig und werden gleichzeitig fortgeschrieben
+def merge_aggregates(conn, year, tables=None, workers=1):
+    tables = [table for table in sql.AGGREGATES if tables is None or table in tables]
+    run_concurrently(conn, [partial(merge_aggregate, table=table, year=year) for table in tables], workers)
+
+
+# Neu hinzugekommene Aggregat-Tabellen für die bereits geladenen Jahre nachberechnen
+def backfill_aggregates(conn, tables, workers=1):
+    years = [year for (year,) in conn.execute('SELECT "year" FROM ingested_partitions ORDER BY "year";').fetchall()]
+    for year in years:
+        with stage(f"Nachberechnen {year}"):
+            merge_aggregates(conn, year, tables, workers)
+
+
+# Lädt eine Jahresdatei in einem Durchlauf: Einlesen, Schlüssel zuordnen und Sortieren in einer Anweisung
+def load_flights(conn, year, path):
+    source = sql.FLIGHTS_CSV.format(flights_csv=sql_path(path), options='')
+    with stage("Unbekannte Codes"):
+        conn.execute(sql.REGISTER_CODES.format(source=source))
+    with stage(f"Laden {path.name}"):
+        conn.execute(sql.INSERT_FLIGHTS.format(source=source, year=year, month='NULL'))
+
+
+# Lädt eine Jahresdatei mit begrenztem Speicher: die Datei wird in Puffern fester Größe in eine
+# Zwischentabelle gestreamt und von dort Monat für Monat nach Datum sortiert übernommen. Jede
+# Sortierung umfasst nur einen Monat, die Reihenfolge in "flights" ist dieselbe wie bei load_flights.
+def load_flights_chunked(conn, year, path):
+    source = sql.FLIGHTS_CSV.format(flights_csv=sql_path(path), options=f", buffer_size = {CSV_BUFFER_SIZE}")
+    with stage(f"Zwischentabelle {path.name}"):
+        conn.execute(sql.STAGE_FLIGHTS.format(source=source))
+    try:
+        with stage("Unbekannte Codes"):
+            conn.execute(sql.REGISTER_CODES.format(source='flights_staging'))
+        with stage(f"Laden {path.name} je Monat"):
+            for month in range(1, 13):
+                conn.execute(sql.INSERT_FLIGHTS.format(source='flights_staging', year=year, month=month))
+    finally:
+        conn.execute(sql.DROP_STAGING)
+
+
+# Lädt eine Jahresdatei als Partition; der Fingerabdruck wird erst ganz am Ende gespeichert,
+# ein abgebrochener Lauf wird daher beim nächsten Mal wiederholt
+def ingest_partition(conn, year, path, chunked=False, workers=1):
+    file_size, file_mtime_ns = partition_fingerprint(path)
+    conn.execute(sql.DELETE_PARTITION.format(year=year))
+    if chunked:
+        load_flights_chunked(conn, year, path)
+    else:
+        load_flights(conn, year, path)
+    prepare_partition(conn, year)
+    # Neue Row Groups samt Min/Max-Statistik in die Datei schreiben
+    with stage("Checkpoint"):
+        conn.execute("CHECKPOINT;")
+    merge_aggregates(conn, year, workers=workers)
+    conn.execute(sql.RECORD_PARTITION.format(
+        year=year, source_file=sql_path(path.name), file_size=file_size, file_mtime_ns=file_mtime_ns
+    ))
+
+
+def source_fingerprint(conn):
+    return conn.execute(sql.SOURCE_FINGERPRINT).fetchone()[0]
+
+
+# Fingerabdruck der Quelldaten und Definition je gespeicherter Tabelle
+def built_state(conn):
+    return {
+        name: (fingerprint, definition)
+        for name, fingerprint, definition in conn.execute('SELECT "name", "fingerprint", "definition" FROM materializations;').fetchall()
+    }
+
+
+def record_materialization(conn, table, fingerprint, definition):
+    conn.execute(sql.RECORD_MATERIALIZATION.format(
+        name=sql_path(table), fingerprint=sql_path(fingerprint), definition=sql_path(definition)
+    ))
+
+
+# Die Aggregat-Tabellen werden je Partition fortgeschrieben; hier wird nur ihr Stand vermerkt
+def record_aggregates(conn, fingerprint, definition):
+    built = built_state(conn)
+    for table in sql.AGGREGATES:
+        if built.get(table) != (fingerprint, definition):
+            record_materialization(conn, table, fingerprint, definition)
+
+
+def materialize_view(conn, table, view, fingerprint, definition):
+    with stage(f"Materialisieren {view} -> {table}"):
+        conn.execute("BEGIN TRANSACTION;")
+        try:
+            conn.execute(sql.MATERIALIZE.format(table=table, view=view))
+            record_materialization(conn, table, fingerprint, definition)
+            conn.execute("COMMIT;")
+        except Exception:
+            conn.execute("ROLLBACK;")
+            raise
+
+
+# Speichert die Analyse-Views als Tabellen, mehrere gleichzeitig; neu aufgebaut wird nur,
+# wenn sich die Quelldaten oder die Definition geändert haben
+def materialize_views(conn, fingerprint, definition, workers=1):
+    built = built_state(conn)
+    tasks = []
+    for table, view in sql.MATERIALIZED_VIEWS.items():
+        if built.get(table) == (fingerprint, definition):
+            logger.info("%s ist aktuell", table)
+            continue
+        tasks.append(partial(materialize_view, table=table, view=view, fingerprint=fingerprint, definition=definition))
+    run_concurrently(conn, tasks, workers)
+
+
+# Exportiert die Flugdaten der neu geladenen Jahre (und fehlender Jahre) als Parquet-Partitionen.
+# Jedes Jahr wird erst in ein temporäres Verzeichnis geschrieben und dann gegen das alte ausgetauscht.
+def export_facts(conn, config, years):
+    config.facts_dir.mkdir(parents=True, exist_ok=True)
+    loaded = [year for (year,) in conn.execute('SELECT "year" FROM ingested_partitions ORDER BY "year";').fetchall()]
+    for year in loaded:
+        target = config.facts_dir / f"year={year}"
+        if year not in years and target.exists():
+            continue
+        with stage(f"Export Flugdaten {year}"):
+            tmp_dir = config.facts_dir / f".tmp-{year}"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            conn.execute(sql.EXPORT_FACTS.format(year=year, directory=sql_path(tmp_dir)))
+            shutil.rmtree(target, ignore_errors=True)
+            (tmp_dir / f"year={year}").rename(target)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# Unterhalb dieser Zeilenzahl lohnt sich das Verteilen auf Prozesse nicht
+PARALLEL_MIN_ROWS = 1_000_000
+
+
+def sum_groups(df, keys, columns):
+    return df.groupby(keys)[columns].sum().reset_index()
+
+
+# groupby(keys)[columns].sum() in Teilen je Jahr und Monat auf den Prozessen des Pools.
+# Jahr und Monat gehören zu den Schlüsseln, die Teilergebnisse überschneiden sich also nicht;
+# sie werden aneinandergehängt und wie bei groupby nach den Schlüsseln sortiert.
+def grouped_sum(df, keys, columns, processes=None):
+    if processes is None or len(df) < PARALLEL_MIN_ROWS:
+        return sum_groups(df, keys, columns)
+    parts = [part for _, part in df.groupby(['year', 'month'], sort=False)]
+    if len(parts) <= 1:
+        return sum_groups(df, keys, columns)
+    partials = processes.map(sum_groups, parts, repeat(keys), repeat(columns))
+    return pd.concat(partials, ignore_index=True).sort_values(keys, ignore_index=True)
+
+
+# Anzahl der Stornierungen pro Fluggesellschaft
+def build_cancellations_summary(conn, processes=None):
+    cancellations_df = conn.execute("SELECT * FROM vw_cancellations;").df()
+    cancellations_summary = grouped_sum(cancellations_df, ['cancellation_reason', 'airline', 'year', 'month'], 'cancellations', processes)
+    cancellations_summary['percentage'] = (cancellations_summary['cancellations'] / cancellations_summary['cancellations'].sum()) * 100
+    return cancellations_summary
+
+
+# Statistiken zu den Fluggesellschaften pro Monat
+def build_airlines_summary(conn, processes=None):
+    airlines_metrics_df = conn.execute("SELECT * FROM agg_airlines_metrics;").df()
+    return grouped_sum(airlines_metrics_df, ['airline', 'month', 'month_int', 'year'], ['total_flights', 'percent of arrivals on time', 'percent of departures on time', 'cancellation_rate_percent'], processes)
+
+
+def build_flight_routes_summary(conn, processes=None):
+    return conn.execute("SELECT * FROM vw_flight_routes;").df()
+
+
+# Zusammenfassungen, die von den Dash-Seiten gelesen werden
+SUMMARIES = {
+    'cancellations_summary': build_cancellations_summary,
+    'airliness_summary': build_airlines_summary,
+    'flight_routes_summary': build_flight_routes_summary,
+}
+
+
+def export_summary(conn, name, config, processes=None):
+    with stage(f"Export {name}"):
+        summary = SUMMARIES[name](conn, processes)
+        write_summary(summary, name, config.output_dir)
+        if config.write_csv:
+            summary.to_csv(config.output_dir / f"{name}.csv", index=False)
+
+
+# Die Zusammenfassungen werden gleichzeitig abgefragt, die pandas-Stufen laufen im Prozess-Pool
+def export_summaries(conn, config):
+    config.output_dir.mkdir(parents=True, exist_ok=True)
+    with process_pool(config.workers) as processes:
+        tasks = [partial(export_summary, name=name, config=config, processes=processes) for name in SUMMARIES]
+        run_concurrently(conn, tasks, config.workers)
+
+
+# Entfernt lange unbenutzte Versionen der Caches der Dash-Seiten: die gemeinsamen Frames zum
+# Ausgabeverzeichnis und, wenn die Seiten aus diesem lesen, die Callback- und Karten-Caches
+def prune_caches(config):
+    roots = [shared_dir(config.output_dir)]
+    if config.output_dir.resolve() == DATA_DIR.resolve():
+        roots += [Path(directory) for directory in (CACHE_DIR, MAP_DIR) if directory]
+    with stage("Alte Cache-Versionen"):
+        for root in roots:
+            prune_versions(root)
+
+
+# Lädt neue oder geänderte Jahresdateien und aktualisiert die Zusammenfassungen der Dash-Seiten
+def run_pipeline(config):
+    if not config.year_files():
+        raise FileNotFoundError(f"Keine Jahresdateien (z.B. 2015.csv) in {config.raw_dir}")
+
+    with stage("Pipeline"):
+        conn = connect(config)
+        try:
+            full_refresh = config.full_refresh
+            if not full_refresh and outdated_schema(conn):
+                logger.warning("Veraltetes Schema der Tabelle flights, alle Jahre werden neu geladen")
+                full_refresh = True
+            if full_refresh:
+                with stage("Zurücksetzen"):
+                    conn.execute(sql.RESET)
+            with stage("Dimensionen"):
+                load_dimensions(conn, config)
+            definition = definition_fingerprint(config)
+            created = ensure_schema(conn, definition)
+            if created:
+                backfill_aggregates(conn, created, config.workers)
+
+            pending = pending_partitions(conn, config)
+            if not pending:
+                logger.info("Keine neuen oder geänderten Jahresdateien")
+            for year, path in pending.items():
+                with stage(f"Partition {year}"):
+                    ingest_partition(conn, year, path, chunked=bool(config.memory_limit), workers=config.workers)
+
+            fingerprint = source_fingerprint(conn)
+            record_aggregates(conn, fingerprint, definition)
+            if config.materialize:
+                materialize_views(conn, fingerprint, definition, config.workers)
+
+            # Ohne neue Daten bleiben die Dateien und damit die Datenversion der Seiten (Caches) unverändert
+            if pending or full_refresh or created or not all(store_path(name, config.output_dir).exists() for name in SUMMARIES):
+                export_summaries(conn, config)
+            else:
+                logger.info("Zusammenfassungen sind aktuell")
+            if config.export_facts:
+                export_facts(conn, config, pending)
+        finally:
+            conn.close()
+        prune_caches(config)
+
+    peak = peak_memory_mb()
+    if peak is not None:
+        logger.info(
+            "Speicher-Spitze: Hauptprozess %.0f MB%s, größter Kindprozess %.0f MB",
+            peak[0], f" (Limit DuckDB: {config.memory_limit})" if config.memory_limit else "", peak[1]
+        )
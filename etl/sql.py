@@ -0,0 +1,816 @@
+# SQL-Anweisungen der Data Preparation, übernommen aus DataPreparation.ipynb.
+# Dateipfade werden über str.format eingesetzt (siehe pipeline.sql_path).
+
+RESET = """
+DROP TABLE IF EXISTS flights_staging;
+DROP TABLE IF EXISTS mv_time_analysis;
+DROP TABLE IF EXISTS mv_flight_metrics;
+DROP TABLE IF EXISTS mv_airlines_metrics;
+DROP TABLE IF EXISTS mv_ABT;
+DROP TABLE IF EXISTS materializations;
+DROP VIEW IF EXISTS vw_time_analysis;
+DROP VIEW IF EXISTS vw_cancellations;
+DROP VIEW IF EXISTS vw_flight_routes;
+DROP VIEW IF EXISTS vw_flight_metrics;
+DROP VIEW IF EXISTS vw_airlines_metrics;
+DROP TABLE IF EXISTS agg_airlines_metrics;
+DROP TABLE IF EXISTS agg_airline_airports;
+DROP TABLE IF EXISTS agg_cancellations;
+DROP TABLE IF EXISTS agg_flight_routes;
+DROP VIEW IF EXISTS vw_ABT;
+DROP VIEW IF EXISTS vw_OneBigTable;
+DROP TABLE IF EXISTS ingested_partitions;
+DROP TABLE IF EXISTS "time";
+DROP TABLE IF EXISTS flights;
+DROP TABLE IF EXISTS cancellation_reasons;
+DROP TABLE IF EXISTS airlines;
+DROP TABLE IF EXISTS airports;
+DROP SEQUENCE IF EXISTS flight_id;
+DROP SEQUENCE IF EXISTS airline_id;
+DROP SEQUENCE IF EXISTS airport_id;
+DROP MACRO IF EXISTS hhmm_to_time;
+DROP MACRO IF EXISTS month_abbr;
+"""
+
+# Sequenz und Tabelle "airports" erstellen und aus der csv-Datei befüllen
+AIRPORTS = """
+CREATE SEQUENCE IF NOT EXISTS airport_id
+INCREMENT BY 1 MINVALUE 0;
+
+CREATE TABLE IF NOT EXISTS airports (
+    airport_id INTEGER PRIMARY KEY DEFAULT(nextval('airport_id')),
+    iata_code VARCHAR(5),
+    airport VARCHAR(255),
+    city VARCHAR(255),
+    state VARCHAR(255),
+    country VARCHAR(255),
+    latitude DOUBLE,
+    longitude DOUBLE,
+    CONSTRAINT airport_id UNIQUE (airport_id)
+);
+
+-- Mit der csv-Datei abgleichen: vorhandene Codes behalten ihre ID (stabil über alle Jahre) und
+-- erhalten die aktuellen Attribute, neue Codes werden angehängt. Codes, die nicht mehr in der
+-- Datei stehen, bleiben für ihre Flüge erhalten, aber ohne Attribute (wie unbekannte Codes).
+CREATE OR REPLACE TEMP TABLE airports_source AS
+SELECT DISTINCT "IATA_CODE", "AIRPORT", "CITY", "STATE","COUNTRY","LATITUDE","LONGITUDE"
+FROM read_csv_auto({airports_csv});
+
+UPDATE airports
+SET "airport" = s."AIRPORT", "city" = s."CITY", "state" = s."STATE", "country" = s."COUNTRY",
+    "latitude" = s."LATITUDE", "longitude" = s."LONGITUDE"
+FROM airports_source s
+WHERE airports."iata_code" = s."IATA_CODE";
+
+UPDATE airports
+SET "airport" = NULL, "city" = NULL, "state" = NULL, "country" = NULL, "latitude" = NULL, "longitude" = NULL
+WHERE "iata_code" NOT IN (SELECT "IATA_CODE" FROM airports_source WHERE "IATA_CODE" IS NOT NULL);
+
+INSERT INTO airports("iata_code", "airport","city","state","country","latitude","longitude")
+SELECT *
+FROM airports_source
+WHERE "IATA_CODE" NOT IN (SELECT "iata_code" FROM airports WHERE "iata_code" IS NOT NULL);
+
+DROP TABLE airports_source;
+"""
+
+# Anlegen und Befüllen der Tabelle "airlines"
+AIRLINES = """
+CREATE SEQUENCE IF NOT EXISTS "airline_id"
+INCREMENT BY 1 MINVALUE 100;
+
+CREATE TABLE IF NOT EXISTS airlines
+(
+    "airline_id" INTEGER PRIMARY KEY DEFAULT(nextval('airline_id')),
+    "iata_code" VARCHAR(10),
+    "airline" VARCHAR(255),
+    CONSTRAINT "airline_id" UNIQUE ("airline_id")
+    );
+
+-- Abgleich mit der csv-Datei wie bei "airports"
+CREATE OR REPLACE TEMP TABLE airlines_source AS
+SELECT DISTINCT "IATA_CODE", "AIRLINE"
+FROM read_csv({airlines_csv},
+              delim = ',',
+              header = true,
+              Columns = {{
+              'IATA_CODE': 'VARCHAR(5)',
+              'AIRLINE': 'VARCHAR(255)'
+              }});
+
+UPDATE airlines
+SET "airline" = s."AIRLINE"
+FROM airlines_source s
+WHERE airlines."iata_code" = s."IATA_CODE";
+
+UPDATE airlines
+SET "airline" = NULL
+WHERE "iata_code" NOT IN (SELECT "IATA_CODE" FROM airlines_source WHERE "IATA_CODE" IS NOT NULL);
+
+INSERT INTO airlines("iata_code","airline")
+SELECT *
+FROM airlines_source
+WHERE "IATA_CODE" NOT IN (SELECT "iata_code" FROM airlines WHERE "iata_code" IS NOT NULL);
+
+DROP TABLE airlines_source;
+"""
+
+# Die IDs für den Primary Key sind willkürlich, sie müssen aber unterschiedlich sein
+CANCELLATION_REASONS = """
+CREATE TABLE IF NOT EXISTS cancellation_reasons
+(
+    "cr_id" INTEGER PRIMARY KEY,
+    "reason" VARCHAR(255),
+    "shortcut" VARCHAR(5)
+);
+
+INSERT OR IGNORE INTO cancellation_reasons
+VALUES
+(90, 'Airline/ Carrier', 'A'),
+(80,'Weather', 'B'),
+(70,'National Air System', 'C'),
+(60,'Security', 'D'),
+(0, 'Keine Stornierung', 'No');
+"""
+
+FLIGHTS_TABLE = """
+-- Uhrzeit im Format HHMM (z.B. 54.0 oder 1517.0) als TIME; 2400 steht für Mitternacht
+CREATE OR REPLACE MACRO hhmm_to_time(hhmm) AS
+    CASE
+        WHEN hhmm IS NULL OR CAST(hhmm AS INTEGER) % 100 > 59 THEN NULL
+        ELSE make_time(CAST(hhmm AS INTEGER) // 100 % 24, CAST(hhmm AS INTEGER) % 100, 0)
+    END;
+
+-- Monatszahl (1-12) -> Kürzel wie in der Zeit-Dimension ("Jan", "Feb", ...)
+CREATE OR REPLACE MACRO month_abbr(month_int) AS
+    list_extract(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], month_int);
+
+CREATE SEQUENCE IF NOT EXISTS "flight_id"
+INCREMENT BY 1 MINVALUE 0;
+
+-- Faktentabelle im Sternschema: nur ganzzahlige Schlüssel der Dimensionen und Kennzahlen.
+-- Airline, Flughäfen, Städte, Koordinaten und Stornogrund werden erst bei der Ausgabe
+-- (Aggregate, vw_OneBigTable) über die Schlüssel aus den Dimensionen gelesen.
+CREATE TABLE IF NOT EXISTS flights
+(   "flight_id" INTEGER PRIMARY KEY DEFAULT(nextval('flight_id')),
+    "date" DATE,                        -- Schlüssel der Dimension "time"
+    "year" SMALLINT,                    -- Jahrespartition
+    "airline_id" SMALLINT,              -- airlines
+    "origin_airport_id" SMALLINT,       -- airports
+    "destination_airport_id" SMALLINT,  -- airports
+    "cr_id" TINYINT,                    -- cancellation_reasons, NULL = nicht storniert
+    "flight_number" INTEGER,
+    "scheduled_departure" TIME,
+    "departure_time" TIME,
+    "departure_delay" SMALLINT,
+    "taxi_out" SMALLINT,
+    "wheels_off" TIME,
+    "wheels_on" TIME,
+    "taxi_in" SMALLINT,
+    "scheduled_arrival" TIME,
+    "arrival_time" TIME,
+    "arrival_delay" SMALLINT,
+    "cancelled" TINYINT,
+    "diverted" TINYINT,
+    "scheduled_time" SMALLINT,
+    "elapsed_time" SMALLINT,
+    "air_time" SMALLINT,
+    "distance" SMALLINT,
+    "airline_delay" SMALLINT,
+    "weather_delay" SMALLINT,
+    "air_system_delay" SMALLINT,
+    "security_delay" SMALLINT,
+    "late_aircraft_delay" SMALLINT,
+    CONSTRAINT "flight_id" UNIQUE ("flight_id")
+);
+
+-- Tabelle "time" als eigenständige Zeit-Dimension
+CREATE TABLE IF NOT EXISTS "time" (
+    "date" DATE,
+    "year" INTEGER,
+    "month_int" INTEGER,
+    "quarter" INTEGER,
+    "week" INTEGER,
+    "weekday" INTEGER,
+    "weekday_name" VARCHAR(255),
+    "quarter_name" VARCHAR(255),
+    "month_name" VARCHAR(255),
+    "month" VARCHAR(255),
+    "week_name" VARCHAR(255)
+);
+
+-- Bereits geladene Jahrespartitionen mit Fingerabdruck der Quelldatei
+CREATE TABLE IF NOT EXISTS ingested_partitions
+(
+    "year" INTEGER PRIMARY KEY,
+    "source_file" VARCHAR,
+    "file_size" BIGINT,
+    "file_mtime_ns" BIGINT,
+    "row_count" BIGINT,
+    "loaded_at" TIMESTAMP
+);
+"""
+
+# Entfernt eine Jahrespartition, bevor sie neu geladen wird
+DELETE_PARTITION = """
+DELETE FROM flights WHERE "year" = {year};
+DELETE FROM "time" WHERE "year" = {year};
+DELETE FROM ingested_partitions WHERE "year" = {year};
+"""
+
+RECORD_PARTITION = """
+INSERT INTO ingested_partitions
+SELECT {year}, {source_file}, {file_size}, {file_mtime_ns}, COUNT(*), now()
+FROM flights
+WHERE "year" = {year};
+"""
+
+# Eine Jahresdatei mit festen Spaltentypen; "options" ergänzt weitere Parameter von read_csv_auto
+FLIGHTS_CSV = """read_csv_auto({flights_csv},
+                   header = true,
+                   types = {{
+                   'FL_DATE': 'DATE',
+                   'OP_CARRIER': 'VARCHAR',
+                   'OP_CARRIER_FL_NUM': 'INTEGER',
+                   'ORIGIN': 'VARCHAR',
+                   'DEST': 'VARCHAR',
+                   'CRS_DEP_TIME': 'DOUBLE',
+                   'DEP_TIME': 'DOUBLE',
+                   'DEP_DELAY': 'DOUBLE',
+                   'TAXI_OUT': 'DOUBLE',
+                   'WHEELS_OFF': 'DOUBLE',
+                   'WHEELS_ON': 'DOUBLE',
+                   'TAXI_IN': 'DOUBLE',
+                   'CRS_ARR_TIME': 'DOUBLE',
+                   'ARR_TIME': 'DOUBLE',
+                   'ARR_DELAY': 'DOUBLE',
+                   'CANCELLED': 'DOUBLE',
+                   'CANCELLATION_CODE': 'VARCHAR',
+                   'DIVERTED': 'DOUBLE',
+                   'CRS_ELAPSED_TIME': 'DOUBLE',
+                   'ACTUAL_ELAPSED_TIME': 'DOUBLE',
+                   'AIR_TIME': 'DOUBLE',
+                   'DISTANCE': 'DOUBLE',
+                   'CARRIER_DELAY': 'DOUBLE',
+                   'WEATHER_DELAY': 'DOUBLE',
+                   'NAS_DELAY': 'DOUBLE',
+                   'SECURITY_DELAY': 'DOUBLE',
+                   'LATE_AIRCRAFT_DELAY': 'DOUBLE'
+                   }}{options})"""
+
+# Jahresdatei in eine Zwischentabelle laden. DuckDB liest die Datei dabei in Puffern fester Größe
+# und schreibt die Zeilen fortlaufend in die Datenbankdatei, statt sie im Speicher zu sammeln.
+STAGE_FLIGHTS = """
+CREATE OR REPLACE TABLE flights_staging AS SELECT * FROM {source};
+"""
+
+DROP_STAGING = """
+DROP TABLE IF EXISTS flights_staging;
+"""
+
+# Codes einer Jahresdatei, die in airports.csv bzw. airlines.csv fehlen, ohne weitere Attribute
+# in die Dimensionen aufnehmen, damit jeder Flug einen Schlüssel erhält (wie bisher ohne Namen,
+# Stadt und Koordinaten). Gelesen werden nur die drei Code-Spalten.
+REGISTER_CODES = """
+CREATE OR REPLACE TEMP TABLE partition_codes AS
+SELECT DISTINCT "OP_CARRIER", "ORIGIN", "DEST"
+FROM {source};
+
+INSERT INTO airlines ("iata_code")
+SELECT DISTINCT "OP_CARRIER"
+FROM partition_codes
+WHERE "OP_CARRIER" IS NOT NULL
+  AND "OP_CARRIER" NOT IN (SELECT "iata_code" FROM airlines WHERE "iata_code" IS NOT NULL);
+
+INSERT INTO airports ("iata_code")
+SELECT DISTINCT "code"
+FROM (SELECT unnest(["ORIGIN", "DEST"]) AS "code" FROM partition_codes)
+WHERE "code" IS NOT NULL
+  AND "code" NOT IN (SELECT "iata_code" FROM airports WHERE "iata_code" IS NOT NULL);
+
+DROP TABLE partition_codes;
+"""
+
+# Befüllen der Tabelle "flights" aus einer Jahresdatei (z.B. "2014.csv", siehe FLIGHTS_CSV)
+# oder aus der Zwischentabelle; month = NULL lädt das ganze Jahr, sonst nur diesen Monat.
+# Die Spaltentypen sind fest vorgegeben, die Uhrzeiten im Format HHMM werden
+# schon beim Einlesen in TIME umgewandelt (ein Durchlauf, kein UPDATE danach).
+# Die Codes werden beim Einlesen auf die Schlüssel der Dimensionen abgebildet.
+# Die Zeilen werden nach Datum sortiert abgelegt: jede Row Group deckt dann nur einen kurzen
+# Zeitraum ab, und Filter auf "date", "year" oder Monat überspringen Row Groups anhand ihrer Min/Max-Werte.
+INSERT_FLIGHTS = """
+INSERT INTO flights
+(
+    "date",
+    "year",
+    "airline_id",
+    "origin_airport_id",
+    "destination_airport_id",
+    "cr_id",
+    "flight_number",
+    "scheduled_departure",
+    "departure_time",
+    "departure_delay",
+    "taxi_out",
+    "wheels_off",
+    "wheels_on",
+    "taxi_in",
+    "scheduled_arrival",
+    "arrival_time",
+    "arrival_delay",
+    "cancelled",
+    "diverted",
+    "scheduled_time",
+    "elapsed_time",
+    "air_time",
+    "distance",
+    "airline_delay",
+    "weather_delay",
+    "air_system_delay",
+    "security_delay",
+    "late_aircraft_delay"
+)
+SELECT
+f."FL_DATE",
+EXTRACT(YEAR FROM f."FL_DATE"),
+al."airline_id",
+o."airport_id",
+d."airport_id",
+cr."cr_id",
+f."OP_CARRIER_FL_NUM",
+hhmm_to_time(f."CRS_DEP_TIME"),
+hhmm_to_time(f."DEP_TIME"),
+f."DEP_DELAY",
+f."TAXI_OUT",
+hhmm_to_time(f."WHEELS_OFF"),
+hhmm_to_time(f."WHEELS_ON"),
+f."TAXI_IN",
+hhmm_to_time(f."CRS_ARR_TIME"),
+hhmm_to_time(f."ARR_TIME"),
+f."ARR_DELAY",
+f."CANCELLED",
+f."DIVERTED",
+f."CRS_ELAPSED_TIME",
+f."ACTUAL_ELAPSED_TIME",
+f."AIR_TIME",
+f."DISTANCE",
+f."CARRIER_DELAY",
+f."WEATHER_DELAY",
+f."NAS_DELAY",
+f."SECURITY_DELAY",
+f."LATE_AIRCRAFT_DELAY"
+FROM {source} f
+LEFT JOIN airlines al ON al."iata_code" = f."OP_CARRIER"
+LEFT JOIN airports o ON o."iata_code" = f."ORIGIN"
+LEFT JOIN airports d ON d."iata_code" = f."DEST"
+LEFT JOIN cancellation_reasons cr ON cr."shortcut" = f."CANCELLATION_CODE"
+WHERE EXTRACT(YEAR FROM f."FL_DATE") = {year}
+  AND ({month} IS NULL OR EXTRACT(MONTH FROM f."FL_DATE") = {month})
+ORDER BY f."FL_DATE";
+"""
+
+# Anlegen der Tabelle "time" als eigenständige Zeit-Dimension, befüllt je Jahrespartition
+TIME_DIMENSION = """
+INSERT INTO time ("date", "year", "month_int", "quarter", "week", "weekday", "weekday_name", "quarter_name", "month_name", "month", "week_name")
+SELECT
+    DISTINCT "date",
+    EXTRACT(YEAR FROM "date") AS "year",
+    EXTRACT(MONTH FROM "date") AS "month_int",
+    EXTRACT(QUARTER FROM "date") AS "quarter",
+    EXTRACT(WEEK FROM "date") AS "week",
+    EXTRACT(DOW FROM "date") AS "weekday",
+    -- Berechne den abgekürzten Wochentagnamen
+    CASE
+        WHEN EXTRACT(DOW FROM "date") = 0 THEN 'Sun'
+        WHEN EXTRACT(DOW FROM "date") = 1 THEN 'Mon'
+        WHEN EXTRACT(DOW FROM "date") = 2 THEN 'Tue'
+        WHEN EXTRACT(DOW FROM "date") = 3 THEN 'Wed'
+        WHEN EXTRACT(DOW FROM "date") = 4 THEN 'Thu'
+        WHEN EXTRACT(DOW FROM "date") = 5 THEN 'Fri'
+        WHEN EXTRACT(DOW FROM "date") = 6 THEN 'Sat'
+    END AS weekday_name,
+    -- Formatierung für Quartal
+    'Q' || EXTRACT(QUARTER FROM "date") || ' ' || EXTRACT(YEAR FROM "date") AS "quarter_name",
+    -- Formatierung für Monat
+    CASE EXTRACT(MONTH FROM "date")
+        WHEN 1 THEN 'Jan'
+        WHEN 2 THEN 'Feb'
+        WHEN 3 THEN 'Mar'
+        WHEN 4 THEN 'Apr'
+        WHEN 5 THEN 'May'
+        WHEN 6 THEN 'Jun'
+        WHEN 7 THEN 'Jul'
+        WHEN 8 THEN 'Aug'
+        WHEN 9 THEN 'Sep'
+        WHEN 10 THEN 'Oct'
+        WHEN 11 THEN 'Nov'
+        WHEN 12 THEN 'Dec'
+    END || ' ' || EXTRACT(YEAR FROM "date") AS "month_name",
+    CASE EXTRACT(MONTH FROM "date")
+        WHEN 1 THEN 'Jan'
+        WHEN 2 THEN 'Feb'
+        WHEN 3 THEN 'Mar'
+        WHEN 4 THEN 'Apr'
+        WHEN 5 THEN 'May'
+        WHEN 6 THEN 'Jun'
+        WHEN 7 THEN 'Jul'
+        WHEN 8 THEN 'Aug'
+        WHEN 9 THEN 'Sep'
+        WHEN 10 THEN 'Oct'
+        WHEN 11 THEN 'Nov'
+        WHEN 12 THEN 'Dec'
+    END AS month,
+    -- Formatierung für Kalenderwoche
+    'W' || EXTRACT(WEEK FROM "date") || ' ' || EXTRACT(YEAR FROM "date") AS "week_name"
+FROM flights
+WHERE "year" = {year}
+ORDER BY "date";
+"""
+
+# One Big Table
+# Löst die Schlüssel der Faktentabelle wieder in die Attribute der Dimensionen auf (für Ad-hoc-Analysen)
+VW_ONE_BIG_TABLE = """
+CREATE OR REPLACE VIEW vw_OneBigTable AS
+SELECT
+    f."flight_id",
+    f."year",
+    f."date",
+    t."weekday_name",
+    t."quarter_name",
+    t."month_name",
+    t."month_int",
+    t."month",
+    t."week_name",
+    al."iata_code" AS "iata_airline",
+    al."airline" AS "airline",
+    f."flight_number",
+    -- Die Jahresdateien enthalten keine Kennzeichen
+    CAST(NULL AS VARCHAR) AS "tail_number",
+    o."iata_code" AS "origin_airport",
+    o."city" AS "origin_city",
+    o."longitude" AS "origin_airport_lon",
+    o."latitude" AS "origin_airport_lat",
+    d."iata_code" AS "destination_airport",
+    d."city" AS "destination_city",
+    d."longitude" AS "destination_airport_lon",
+    d."latitude" AS "destination_airport_lat",
+    f."scheduled_departure",
+    f."departure_time",
+    f."departure_delay",
+    f."taxi_out",
+    f."wheels_off",
+    f."scheduled_time",
+    f."elapsed_time",
+    f."air_time",
+    f."distance"*1.60934 AS "distance_km",
+    f."wheels_on",
+    f."taxi_in",
+    f."scheduled_arrival",
+    f."arrival_time",
+    f."arrival_delay",
+    f."diverted",
+    f."cancelled",
+    cr."reason" AS "cancellation_reason",
+    f."air_system_delay",
+    f."security_delay",
+    f."airline_delay",
+    f."late_aircraft_delay",
+    f."weather_delay"
+-- Keine Sortierung: die Daten liegen bereits nach Datum geordnet in "flights",
+-- die Views und Aggregate darüber brauchen keine Reihenfolge
+FROM flights f
+LEFT JOIN "time" t ON t."date" = f."date"
+LEFT JOIN airlines al ON al."airline_id" = f."airline_id"
+LEFT JOIN airports o ON o."airport_id" = f."origin_airport_id"
+LEFT JOIN airports d ON d."airport_id" = f."destination_airport_id"
+LEFT JOIN cancellation_reasons cr ON cr."cr_id" = f."cr_id";
+"""
+
+# Nur die durchgeführten ("cancelled = 0") Flüge
+VW_ABT = """
+CREATE OR REPLACE VIEW vw_ABT AS
+SELECT * FROM vw_OneBigTable
+WHERE "cancelled" = 0;
+"""
+
+# Analysen im Kontext "airlines" je Jahrespartition; pünktlich = weniger als 15 Minuten Verspätung.
+# Aggregiert wird über die Schlüssel der Faktentabelle, Namen kommen erst danach aus den Dimensionen.
+SELECT_AIRLINES_METRICS = """
+WITH metrics AS (
+    SELECT
+        "airline_id",
+        "year",
+        month("date") AS "month_int",
+        AVG("arrival_delay") AS "average_arrival_delay",
+        MEDIAN("arrival_delay") AS "median_arrival_delay",
+        AVG("departure_delay") AS "average_departure_delay",
+        MEDIAN("departure_delay") AS "median_departure_delay",
+        COUNT("flight_id") AS "total_flights",
+        ROUND(SUM("distance") * 1.60934, 0) AS distance_km,
+        ROUND((SUM(CASE
+            WHEN ("departure_delay" >= 15) AND "cancelled" = 0 THEN 0
+            ELSE 1
+            END) / COUNT("flight_id")) * 100, 1) AS "percent of departures on time",
+        ROUND((SUM(CASE
+                 WHEN ("arrival_delay" >=15 AND "cancelled" = 0) THEN 0
+                 ELSE 1
+                 END) / COUNT("flight_id")) * 100, 1) AS "percent of arrivals on time",
+        ROUND((SUM(CASE
+            WHEN "cancelled" = 1 THEN 1
+            ELSE 0
+            END) / COUNT("flight_id")) * 100, 1) AS "cancellation_rate_percent",
+        SUM("cancelled") AS "cancellations",
+        ROUND((AVG("elapsed_time")- AVG("scheduled_time")),1) AS "buffer_flight"
+    FROM flights
+    WHERE "year" = {year}
+    GROUP BY "airline_id", "year", month("date")
+)
+SELECT
+    al."airline",
+    al."iata_code" AS "iata_airline",
+    m."year",
+    month_abbr(m."month_int") AS "month",
+    m."month_int",
+    m."average_arrival_delay",
+    m."median_arrival_delay",
+    m."average_departure_delay",
+    m."median_departure_delay",
+    m."total_flights",
+    m."distance_km",
+    m."percent of departures on time",
+    m."percent of arrivals on time",
+    m."cancellation_rate_percent",
+    m."cancellations",
+    m."buffer_flight"
+FROM metrics m
+LEFT JOIN airlines al ON al."airline_id" = m."airline_id"
+"""
+
+# Flüge je Airline und Start- bzw. Zielflughafen je Jahrespartition, in einem Durchlauf über GROUPING SETS
+SELECT_AIRLINE_AIRPORTS = """
+WITH airport_flights AS (
+    SELECT
+        "airline_id",
+        "year",
+        CASE WHEN GROUPING("origin_airport_id") = 0 THEN 'origin' ELSE 'destination' END AS "role",
+        COALESCE("origin_airport_id", "destination_airport_id") AS "airport_id",
+        COUNT(*) AS "flights"
+    FROM flights
+    WHERE "year" = {year}
+    GROUP BY GROUPING SETS (
+        ("airline_id", "year", "origin_airport_id"),
+        ("airline_id", "year", "destination_airport_id")
+    )
+)
+SELECT
+    al."airline",
+    f."year",
+    f."role",
+    ap."iata_code" AS "airport",
+    f."flights"
+FROM airport_flights f
+LEFT JOIN airlines al ON al."airline_id" = f."airline_id"
+LEFT JOIN airports ap ON ap."airport_id" = f."airport_id"
+"""
+
+# Die häufigsten Ziel-/Startflughäfen beziehen sich auf die gesamte Historie einer Airline;
+# sie werden per arg_max aus agg_airline_airports bestimmt statt mit einer Unterabfrage je Zeile
+VW_AIRLINES_METRICS = """
+CREATE OR REPLACE VIEW vw_airlines_metrics AS
+WITH airport_totals AS (
+    SELECT "airline", "role", "airport", SUM("flights") AS "flights"
+    FROM agg_airline_airports
+    GROUP BY "airline", "role", "airport"
+),
+top_airports AS (
+    SELECT
+        "airline",
+        arg_max("airport", "flights") FILTER (WHERE "role" = 'destination') AS "most_frequent_destination",
+        arg_max("airport", "flights") FILTER (WHERE "role" = 'origin') AS "most_frequent_origin"
+    FROM airport_totals
+    GROUP BY "airline"
+)
+SELECT
+    m."airline",
+    m."iata_airline",
+    m."year",
+    m."month",
+    m."month_int",
+    m."average_arrival_delay",
+    m."median_arrival_delay",
+    m."average_departure_delay",
+    m."median_departure_delay",
+    m."total_flights",
+    m."distance_km",
+    m."percent of departures on time",
+    m."percent of arrivals on time",
+    m."cancellation_rate_percent",
+    m."cancellations",
+    t."most_frequent_destination",
+    t."most_frequent_origin",
+    m."buffer_flight"
+FROM agg_airlines_metrics m
+LEFT JOIN top_airports t ON t."airline" = m."airline"
+ORDER BY "average_arrival_delay";
+"""
+
+# Analysen im Kontext "flights"
+VW_FLIGHT_METRICS = """
+CREATE OR REPLACE VIEW vw_flight_metrics AS
+SELECT
+   "tail_number",
+   "airline",
+   "origin_airport",
+   "year",
+   "month",
+   COUNT("flight_id") AS "total_flights",
+   ROUND(SUM("distance_km"),0) AS "total_km",
+   ROUND((AVG("distance_km") / AVG("air_time" / 60.0)),1) AS "average_speed_km"
+FROM vw_ABT
+GROUP BY "origin_airport", "tail_number", "airline", "year", "month"
+ORDER BY "total_flights" DESC, "total_km" DESC;
+"""
+
+# Analysen im Kontext "flight routes" je Jahrespartition (nur durchgeführte Flüge).
+# Die Spaltennamen "count(flight_id)" und "round(sum(distance_km), 0)" erwarten die Dash-Seiten.
+SELECT_FLIGHT_ROUTES = """
+WITH routes AS (
+    SELECT
+        "origin_airport_id",
+        "destination_airport_id",
+        "year",
+        month("date") AS "month_int",
+        COUNT("flight_id") AS "flights",
+        SUM("distance") * 1.60934 AS "distance_km",
+        AVG("distance") * 1.60934 AS "avg_distance_km"
+    FROM flights
+    WHERE "year" = {year} AND "cancelled" = 0
+    GROUP BY "origin_airport_id", "destination_airport_id", "year", month("date")
+)
+SELECT
+            o."iata_code" AS "origin_airport",
+            d."iata_code" AS "destination_airport",
+            o."city" AS "origin_city",
+            d."city" AS "destination_city",
+            o."longitude" AS "origin_airport_lon",
+            o."latitude" AS "origin_airport_lat",
+            d."longitude" AS "destination_airport_lon",
+            d."latitude" AS "destination_airport_lat",
+            r."year",
+            month_abbr(r."month_int") AS "month",
+            r."flights" AS "count(flight_id)",
+            ROUND(r."distance_km", 0) AS "round(sum(distance_km), 0)",
+            ROUND(r."avg_distance_km", 0) AS avg_distance_km
+FROM routes r
+LEFT JOIN airports o ON o."airport_id" = r."origin_airport_id"
+LEFT JOIN airports d ON d."airport_id" = r."destination_airport_id"
+"""
+
+VW_FLIGHT_ROUTES = """
+CREATE OR REPLACE VIEW vw_flight_routes AS
+SELECT * FROM agg_flight_routes;
+"""
+
+# Analysen im Kontext "cancellations" je Jahrespartition
+SELECT_CANCELLATIONS = """
+WITH cancellations AS (
+    SELECT
+        "airline_id",
+        "cancelled",
+        "cr_id",
+        "year",
+        month("date") AS "month_int",
+        CAST(SUM("cancelled") AS INT) AS "cancellations",
+        ROUND(SUM("cancelled")::FLOAT/ COUNT(*) *100, 1) AS "cancellation_rate"
+    FROM flights
+    WHERE "year" = {year}
+    GROUP BY "airline_id", "cancelled", "cr_id", "year", month("date")
+)
+SELECT
+    al."airline",
+    c."cancelled",
+    cr."reason" AS "cancellation_reason",
+    c."year",
+    month_abbr(c."month_int") AS "month",
+    c."cancellations",
+    c."cancellation_rate"
+FROM cancellations c
+LEFT JOIN airlines al ON al."airline_id" = c."airline_id"
+LEFT JOIN cancellation_reasons cr ON cr."cr_id" = c."cr_id"
+"""
+
+VW_CANCELLATIONS = """
+CREATE OR REPLACE VIEW vw_cancellations AS
+SELECT * FROM agg_cancellations;
+"""
+
+# Analysen im Kontext "time"
+VW_TIME_ANALYSIS = """
+CREATE OR REPLACE VIEW vw_time_analysis AS
+SELECT
+    "year",
+    "quarter_name",
+    "month_name",
+    "weekday_name",
+    "airline",
+    "month_int",
+    "month",
+    COUNT(*) AS total_flights,
+    ROUND(MEDIAN("departure_delay"), 1) AS med_departure_delay,
+    ROUND(MEDIAN("arrival_delay"), 1) AS med_arrival_delay,
+    "cancelled",
+    "cancellation_reason"
+FROM vw_OneBigTable
+GROUP BY
+    "year",
+    "quarter_name",
+    "month_name",
+    "weekday_name",
+    "airline",
+    "month_int",
+    "month",
+    "cancelled",
+    "cancellation_reason"
+HAVING AVG("departure_delay") > 15;
+"""
+
+# Aggregat-Tabellen, die je Jahrespartition zusammengeführt werden
+AGGREGATES = {
+    'agg_flight_routes': SELECT_FLIGHT_ROUTES,
+    'agg_cancellations': SELECT_CANCELLATIONS,
+    'agg_airlines_metrics': SELECT_AIRLINES_METRICS,
+    'agg_airline_airports': SELECT_AIRLINE_AIRPORTS,
+}
+
+# Leere Aggregat-Tabelle mit dem Schema der Abfrage anlegen
+CREATE_AGGREGATE = """
+CREATE TABLE IF NOT EXISTS {table} AS {select} LIMIT 0;
+"""
+
+# Aggregat-Tabelle mit veralteter Definition verwerfen, sie wird danach neu angelegt und befüllt
+DROP_AGGREGATE = """
+DROP TABLE IF EXISTS {table};
+"""
+
+# Partition in der Aggregat-Tabelle ersetzen
+MERGE_AGGREGATE = """
+DELETE FROM {table} WHERE "year" = {year};
+INSERT INTO {table} {select};
+"""
+
+# Views, auf denen die Aggregat-Tabellen aufbauen
+BASE_VIEWS = [
+    VW_ONE_BIG_TABLE,
+    VW_ABT,
+]
+
+# Views über den Aggregat-Tabellen und für Ad-hoc-Analysen
+VIEWS = [
+    VW_AIRLINES_METRICS,
+    VW_FLIGHT_METRICS,
+    VW_FLIGHT_ROUTES,
+    VW_CANCELLATIONS,
+    VW_TIME_ANALYSIS,
+]
+
+# Persistierte Tabellen mit Erstellungszeitpunkt, Fingerabdruck der Quelldaten und
+# Kennung der Definition (SQL und Stammdaten, siehe pipeline.definition_fingerprint)
+MATERIALIZATIONS = """
+CREATE TABLE IF NOT EXISTS materializations
+(
+    "name" VARCHAR PRIMARY KEY,
+    "built_at" TIMESTAMP,
+    "fingerprint" VARCHAR
+);
+
+-- Datenbanken älterer Läufe kennen die Definition noch nicht
+ALTER TABLE materializations ADD COLUMN IF NOT EXISTS "definition" VARCHAR;
+"""
+
+# Fingerabdruck aller geladenen Jahrespartitionen; ändert sich mit jeder neuen oder geänderten Jahresdatei
+SOURCE_FINGERPRINT = """
+SELECT md5(COALESCE(string_agg("year" || ':' || "file_size" || ':' || "file_mtime_ns", ',' ORDER BY "year"), ''))
+FROM ingested_partitions;
+"""
+
+RECORD_MATERIALIZATION = """
+INSERT OR REPLACE INTO materializations VALUES ({name}, now(), {fingerprint}, {definition});
+"""
+
+# Views, die mit --materialize als Tabelle gespeichert werden (Tabelle: View)
+MATERIALIZED_VIEWS = {
+    'mv_ABT': 'vw_ABT',
+    'mv_airlines_metrics': 'vw_airlines_metrics',
+    'mv_flight_metrics': 'vw_flight_metrics',
+    'mv_time_analysis': 'vw_time_analysis',
+}
+
+MATERIALIZE = """
+CREATE OR REPLACE TABLE {table} AS SELECT * FROM {view};
+"""
+
+# Flugdaten eines Jahres als Parquet-Datensatz (Hive-Partitionen year=/month_int=, zstd)
+EXPORT_FACTS = """
+COPY (SELECT * FROM vw_OneBigTable WHERE "year" = {year})
+TO {directory} (FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY ("year", "month_int"), OVERWRITE_OR_IGNORE true);
+"""
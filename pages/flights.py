@@ -14,28 +14,35 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import dash_bootstrap_components as dbc
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import base64
+import numpy as np
 
+from datastore import ALL, BACKEND, MONTHS, ConnectionPool, FilterCube, LiveCube, YearlyTotals, data_version, decimal, k_or_m, load_shared_summaries, memoize, percent, thousands
 
 
-# URL zur CSV-Datei
-URL = "https://media.githubusercontent.com/media/swrobuts/Flights/main/cancellations_summary.csv"
-URL2 = "https://media.githubusercontent.com/media/swrobuts/Flights/main/airliness_summary.csv"
 
+if BACKEND == 'duckdb':
+    # Filter-Callbacks fragen die Aggregat-Tabellen der DuckDB-Datenbank direkt ab (FLIGHTS_BACKEND=duckdb)
+    pool = ConnectionPool()
+    cube = LiveCube(pool)
+    cancellations_summary, airlines_summary = cube.summaries()
 
-# Lese die CSV-Datei ein
-cancellations_summary = pd.read_csv(URL)
-airlines_summary = pd.read_csv(URL2)
+    # Stand der Datenbank; Teil des Schlüssels im Ergebnis-Cache der Callbacks
+    DATA_VERSION = pool.version
+else:
+    # Lese die Zusammenfassungen aus dem lokalen Datenspeicher (Parquet, CSV nur als Rückfall);
+    # Texte als Kategorien mit gemeinsamen Wörterbüchern, Jahr als int16, Monat als Zahl (int8).
+    # Aufbereitet liegen sie als Arrow-Dateien vor, die sich alle Worker per mmap teilen
+    cancellations_summary, airlines_summary = load_shared_summaries('cancellations_summary', 'airliness_summary')
 
-# Konvertiere Monatsnamen in numerische Werte
-month_map = {
-    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
-    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12
-}
-cancellations_summary['month'] = cancellations_summary['month'].map(month_map)
-airlines_summary['month'] = airlines_summary['month'].map(month_map)
+    # Stand der geladenen Daten; Teil des Schlüssels im Ergebnis-Cache der Callbacks
+    DATA_VERSION = data_version(['cancellations_summary', 'airliness_summary'])
+
+    # Vorberechneter Würfel über Airline, Grund, Jahr und Monat (inkl. 'Alle') für die Filter-Callbacks
+    cube = FilterCube(cancellations_summary, airlines_summary)
+
+# Jahressummen, Abweichungen zum Vorjahr und Monatsreihen für die Kästchen im Kopf der Seite
+yearly_totals = YearlyTotals(cancellations_summary, airlines_summary)
 
 # App-Layout
 styles = {
@@ -295,15 +302,12 @@ def apply_sidebar_state(data):
 
 
 
-# Callback für die Kästchen mit den Informationen zu allen Flügen und Stornierungen
-def format_k_or_m(value):
-    if value >= 1000000:
-        return f"{value / 1000000:.1f}".replace('.', ',') + ' M'
-    elif value >= 1000:
-        return f"{value / 1000:.1f}".replace('.', ',') + ' K'
-    else:
-        return str(value)
+# Monatsreihe eines Jahres (Index = Monatszahl) als Tabelle mit Monatsnamen für die Sparklines
+def sparkline_frame(monthly, column):
+    month_names = np.array(('',) + MONTHS)
+    return pd.DataFrame({'month': month_names[monthly.index.to_numpy(dtype=int)], column: monthly.to_numpy()})
 
+# Callback für die Kästchen mit den Informationen zu allen Flügen und Stornierungen
 @callback(
     [Output('all-flights-year', 'children'),
     Output('all-flights-total', 'children'),
@@ -317,27 +321,26 @@ def format_k_or_m(value):
     Output('all-cancellations-sparkline', 'figure')],
     [Input('year-dropdown', 'value')]
 )
+@memoize('flights.update_header_boxes', DATA_VERSION)
 def update_header_boxes(selected_year):
-    flights_data = airlines_summary[airlines_summary['year'] == selected_year]
-    cancellations_data = cancellations_summary[cancellations_summary['year'] == selected_year]
-    total_flights = flights_data['total_flights'].sum()
-    total_cancellations = cancellations_data['cancellations'].sum()
+    totals = yearly_totals.get(selected_year)
+    if totals is None:
+        raise PreventUpdate
+    total_flights = totals['flights']
+    total_cancellations = totals['cancellations']
     previous_year = int(selected_year) - 1
-    previous_flights_data = airlines_summary[airlines_summary['year'] == previous_year]
-    previous_cancellations_data = cancellations_summary[cancellations_summary['year'] == previous_year]
 
-    if not previous_flights_data.empty:
-        previous_total_flights = previous_flights_data['total_flights'].sum()
-        flights_difference = total_flights - previous_total_flights
-        flights_percentage_change = (flights_difference / previous_total_flights) * 100
+    if totals['flights_delta'] is not None:
+        flights_difference = totals['flights_delta']
+        flights_percentage_change = totals['flights_delta_percent']
         flights_arrow = '▼' if flights_difference < 0 else '▲'
         flights_color = 'red' if flights_difference < 0 else 'green'
 
         # Formatieren der absoluten Zahl mit Punkten als Tausendertrennzeichen
-        formatted_flights_difference = "{:+,.0f}".format(flights_difference).replace(",", "X").replace(".", ",").replace("X", ".")
+        formatted_flights_difference = thousands(flights_difference, signed=True)
 
         # Formatieren der Prozentzahl mit Komma als Dezimaltrennzeichen
-        formatted_flights_percentage_change = "{:+.1f}".format(flights_percentage_change).replace(".", ",")
+        formatted_flights_percentage_change = decimal(flights_percentage_change, signed=True)
 
         flights_diff_text = html.Span([
             "{} ({} %) ".format(formatted_flights_difference, formatted_flights_percentage_change),
@@ -346,18 +349,17 @@ def update_header_boxes(selected_year):
     else:
         flights_diff_text = None
 
-    if not previous_cancellations_data.empty:
-        previous_total_cancellations = previous_cancellations_data['cancellations'].sum()
-        cancellations_difference = total_cancellations - previous_total_cancellations
-        cancellations_percentage_change = (cancellations_difference / previous_total_cancellations) * 100
+    if totals['cancellations_delta'] is not None:
+        cancellations_difference = totals['cancellations_delta']
+        cancellations_percentage_change = totals['cancellations_delta_percent']
         cancellations_arrow = '▼' if cancellations_difference < 0 else '▲'
         cancellations_color = 'green' if cancellations_difference < 0 else 'red'
 
         # Formatieren der absoluten Zahl mit Punkten als Tausendertrennzeichen
-        formatted_cancellations_difference = "{:+,.0f}".format(cancellations_difference).replace(",", "X").replace(".", ",").replace("X", ".")
+        formatted_cancellations_difference = thousands(cancellations_difference, signed=True)
 
         # Formatieren der Prozentzahl mit Komma als Dezimaltrennzeichen
-        formatted_cancellations_percentage_change = "{:+.1f}".format(cancellations_percentage_change).replace(".", ",")
+        formatted_cancellations_percentage_change = decimal(cancellations_percentage_change, signed=True)
 
         cancellations_diff_text = html.Span([
             "{} ({}%) ".format(formatted_cancellations_difference, formatted_cancellations_percentage_change),
@@ -365,24 +367,16 @@ def update_header_boxes(selected_year):
         ])
     else:
         cancellations_diff_text = None
-    
-    flights_sparkline_data = flights_data.groupby('month')['total_flights'].sum().reset_index()
-    cancellations_sparkline_data = cancellations_data.groupby('month')['cancellations'].sum().reset_index()
 
-   
-    # Behandle fehlende Werte in der Spalte 'month'
-    flights_sparkline_data['month'] = flights_sparkline_data['month'].fillna(0).astype(int)
-    cancellations_sparkline_data['month'] = cancellations_sparkline_data['month'].fillna(0).astype(int)
-   
-    # Konvertiere Monatszahlen in Monatsnamen
-    flights_sparkline_data['month'] = flights_sparkline_data['month'].apply(lambda x: datetime(2000, x, 1).strftime('%b') if x != 0 else '')
-    cancellations_sparkline_data['month'] = cancellations_sparkline_data['month'].apply(lambda x: datetime(2000, x, 1).strftime('%b') if x != 0 else '')
-   
+    # Vorberechnete Monatsreihen mit Monatsnamen statt -zahlen
+    flights_sparkline_data = sparkline_frame(totals['flights_monthly'], 'total_flights')
+    cancellations_sparkline_data = sparkline_frame(totals['cancellations_monthly'], 'cancellations')
+
     # Berechne den Durchschnitt pro Monat
     flights_mean = total_flights / 12
 
     # Berechne den Durchschnitt pro Airlines
-    cancellations_mean = total_cancellations / flights_data['airline'].nunique()
+    cancellations_mean = total_cancellations / totals['airlines']
    
     flights_sparkline_fig = go.Figure(go.Scatter(
         x=flights_sparkline_data['month'],
@@ -391,7 +385,7 @@ def update_header_boxes(selected_year):
         line=dict(color='#1F77B4', width=2),
         fill='tozeroy',
         fillcolor='rgba(31, 119, 180, 0.2)',
-        text=[f"Monat: {month}, Flüge: {format_k_or_m(value)}" for month, value in zip(flights_sparkline_data['month'], flights_sparkline_data['total_flights'])],
+        text="Monat: " + flights_sparkline_data['month'] + ", Flüge: " + k_or_m(flights_sparkline_data['total_flights']),
         hoverinfo='text',
         name='',
         hovertemplate='<b>Monat</b>: %{x}<br><b>Flüge</b>: %{y}'
@@ -406,7 +400,7 @@ def update_header_boxes(selected_year):
             y=[first_month['total_flights'], last_month['total_flights']],
             mode='markers+text',
             marker=dict(color='red', size=8),
-            text=[format_k_or_m(first_month['total_flights']), format_k_or_m(last_month['total_flights'])],
+            text=k_or_m([first_month['total_flights'], last_month['total_flights']]),
             textposition=["bottom center", "bottom center"],
             showlegend=False,
             hoverinfo='text',
@@ -438,7 +432,7 @@ def update_header_boxes(selected_year):
         line=dict(color='#FF7F0E', width=2),
         fill='tozeroy',
         fillcolor='rgba(255, 127, 14, 0.2)',
-        text=[f"Monat: {month}, Stornos: {format_k_or_m(value)}" for month, value in zip(cancellations_sparkline_data['month'], cancellations_sparkline_data['cancellations'])],
+        text="Monat: " + cancellations_sparkline_data['month'] + ", Stornos: " + k_or_m(cancellations_sparkline_data['cancellations']),
         hoverinfo='text',
         name='',
         hovertemplate='<b>Monat</b>: %{x}<br><b>Stornos</b>: %{y}'
@@ -454,7 +448,7 @@ def update_header_boxes(selected_year):
         y=[first_month['cancellations'], last_month['cancellations']],
         mode='markers+text',
         marker=dict(color='red', size=8),
-        text=[format_k_or_m(first_month['cancellations']), format_k_or_m(last_month['cancellations'])],
+        text=k_or_m([first_month['cancellations'], last_month['cancellations']]),
         textposition=["bottom center", "bottom center"],
         showlegend=False,
         hoverinfo='text',
@@ -501,7 +495,7 @@ def update_header_boxes(selected_year):
         html.Div([
             html.Span(f"⌀ Anzahl Flüge pro Monat in {selected_year} ", style={'fontSize': '14px'}),
             html.Br(),
-            html.Span("{:,}".format(int(flights_mean)).replace(',', '.'), style={'fontSize': '16px', 'fontWeight': 'bold'})
+            html.Span(thousands(int(flights_mean)), style={'fontSize': '16px', 'fontWeight': 'bold'})
         ], style={'marginTop': '3px'}),
         flights_sparkline_fig,
         f"",
@@ -518,29 +512,31 @@ def update_header_boxes(selected_year):
         html.Div([
             html.Span(f"⌀ Anzahl Stornos pro Airline", style={'fontSize': '14px'}),
             html.Br(),
-            html.Span("{:,}".format(int(cancellations_mean)).replace(',', '.'), style={'fontSize': '16px', 'fontWeight': 'bold'})
+            html.Span(thousands(int(cancellations_mean)), style={'fontSize': '16px', 'fontWeight': 'bold'})
         ], style={'marginTop': '3px'}),
         cancellations_sparkline_fig
     )
 
+# Balken-Sparkline als SVG-Bild statt einer eigenen Plotly-Figur je Tabellenzeile
+def sparkline_svg(months, values, title, width=110, height=24, bottom=4, bar_width=0.65, color='#7B96C4'):
+    values = np.asarray(values, dtype=float)
+    slots = np.asarray(months) - months.min() if len(values) else np.empty(0)
+    slot_width = width / (slots.max() + 1 if len(values) else 1)
+    top = values.max() if len(values) and values.max() > 0 else 1
+    heights = values / top * (height - bottom)
+    xs = (slots + (1 - bar_width) / 2) * slot_width
+    bars = "".join(
+        f'<rect x="{x:.1f}" y="{height - bottom - h:.1f}" width="{slot_width * bar_width:.1f}" height="{h:.1f}"/>'
+        for x, h in zip(xs, heights)
+    )
+    svg = f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" fill="{color}">{bars}</svg>'
+    src = "data:image/svg+xml;base64," + base64.b64encode(svg.encode()).decode()
+    return html.Img(src=src, title=title, width=width, height=height, style={'display': 'block'})
+
 #Tabelle mit Sparklines
-@callback(
-    Output('flights-table', 'children'),
-    [Input('airline-dropdown', 'value'),
-     Input('reason-dropdown', 'value'),
-     Input('year-dropdown', 'value'),
-     Input('month-dropdown', 'value')]
-)
-def update_flights_table(selected_airline, selected_reason, selected_year, selected_month):
-    filtered_data = airlines_summary.copy()
-    if selected_airline != 'Alle':
-        filtered_data = filtered_data[filtered_data['airline'] == selected_airline]
-    if selected_reason != 'Alle':
-        filtered_data = filtered_data[filtered_data['cancellation_reason'] == selected_reason]
-    if selected_year != 'Alle':
-        filtered_data = filtered_data[filtered_data['year'] == selected_year]
-    if selected_month != 'Alle':
-        filtered_data = filtered_data[filtered_data['month_int'] == int(selected_month)]
+def render_flights_table(slices, selected_year, selected_month):
+    # Die Airline-Statistik ist nicht nach Stornogrund aufgeschlüsselt
+    filtered_data = slices['airlines']
     max_flights = filtered_data['total_flights'].max()
     max_length = max([len(str(x)) for x in filtered_data['total_flights']])
 
@@ -553,48 +549,39 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
     elif selected_year != 'Alle':
         flights_label = f"Alle Flüge in {selected_year}"
 
+    # Monatswerte aller Airlines in einem Durchgang; je Airline zählt der letzte Monat
+    monthly_totals = filtered_data.groupby(['airline', 'month_int', 'month', 'year'], observed=True).agg({
+        'total_flights': 'sum',
+        'percent of arrivals on time': 'mean',
+        'percent of departures on time': 'mean',
+        'cancellation_rate_percent': 'mean'
+    }).reset_index()
+    latest = monthly_totals.groupby('airline', observed=True).tail(1).set_index('airline')
+    airline_rows = monthly_totals.groupby('airline', observed=True).indices
+    month_ints = monthly_totals['month_int'].to_numpy()
+    month_totals = monthly_totals['total_flights'].to_numpy()
+
+    # Reihenfolge wie bisher: absteigend nach dem größten Monatswert der Airline
+    airline_order = filtered_data.groupby('airline', observed=True)['total_flights'].max().sort_values(ascending=False, kind='stable').index
+
+    # Beschriftungen aller Zeilen auf einmal formatieren
+    flights_texts = thousands(latest['total_flights'])
+    arrivals_texts = percent(latest['percent of arrivals on time'])
+    departures_texts = percent(latest['percent of departures on time'])
+    cancellation_texts = percent(latest['cancellation_rate_percent'])
+
     table_rows = []
-    for airline in filtered_data.sort_values('total_flights', ascending=False)['airline'].unique():
-        airline_data = filtered_data[filtered_data['airline'] == airline]
-        monthly_totals = airline_data.groupby(['month_int', 'month', 'year']).agg({
-            'total_flights': 'sum',
-            'percent of arrivals on time': 'mean',
-            'percent of departures on time': 'mean',  
-            'cancellation_rate_percent': 'mean'
-        }).reset_index()
-        hover_texts = [f"{row['month']} {row['total_flights']}" for index, row in monthly_totals.iterrows()]
-	
-        sparkline_fig = go.Figure(
-            go.Bar(
-                x=monthly_totals['month_int'],
-                y=monthly_totals['total_flights'],
-                hoverinfo='text',
-                marker=dict(color='#7B96C4'),
-                hovertext=hover_texts,
-                width=0.65
-            )
-        )
-        sparkline_fig.update_layout(
-        hoverlabel=dict(
-            bgcolor="white",
-            font=dict(color="black")
-            ),
-            height=24,
-            width=110,
-            margin=dict(l=0, r=0, t=0, b=4),
-            xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-            yaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
-            plot_bgcolor='rgba(255,255,255,1)',
-            paper_bgcolor='rgba(255,255,255,1)'
-        )
+    for airline in airline_order:
+        rows = airline_rows[airline]
+        hover_text = ", ".join(f"{MONTHS[month - 1]} {flights}" for month, flights in zip(month_ints[rows], month_totals[rows]))
+        sparkline = sparkline_svg(month_ints[rows], month_totals[rows], hover_text)
 
         # Umwandlung des Pünktlichkeitsprozentsatzes und der Stornoquote in das gewünschte Format
-        percent_format = lambda x: "{} %".format(x.replace('.', ','))
-        cancellation_rate_formatted = percent_format(f"{monthly_totals['cancellation_rate_percent'].iloc[-1]:.1f}")
+        cancellation_rate_formatted = cancellation_texts[airline]
 
     
-        flights_value_formatted = f"{monthly_totals['total_flights'].iloc[-1]:{max_length},}".replace(",", ".")
-        bar_width = f"{(monthly_totals['total_flights'].iloc[-1] / max_flights) * 60:.1f}%"
+        flights_value_formatted = flights_texts[airline]
+        bar_width = f"{(latest.at[airline, 'total_flights'] / max_flights) * 60:.1f}%"
         flights_value_and_bar = html.Div([
             html.Div(flights_value_formatted, style={'width': f'{max_length * 7}px', 'textAlign': 'right', 'marginRight': '8px'}),
             html.Div(style={
@@ -617,7 +604,7 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
         style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center'},
         children=[
         html.Span(
-            "{} %".format(monthly_totals['percent of arrivals on time'].iloc[-1].astype(str).replace('.', ',')),
+            arrivals_texts[airline],
             style={'display': 'inline-block', 'textAlign': 'right', 'width': '40px'}
         ),
         html.Div(
@@ -625,7 +612,7 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
             style={
                 'width': '10px',
                 'height': '10px',
-                'backgroundColor': 'red' if monthly_totals['percent of departures on time'].iloc[-1] < 80 else 'transparent',
+                'backgroundColor': 'red' if latest.at[airline, 'percent of departures on time'] < 80 else 'transparent',
                 'borderRadius': '50%',
                 'display': 'inline-block',
                 'marginLeft': '8px'
@@ -638,7 +625,7 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
         style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center'},
         children=[
         html.Span(
-            "{} %".format(monthly_totals['percent of departures on time'].iloc[-1].astype(str).replace('.', ',')),
+            departures_texts[airline],
             style={'display': 'inline-block', 'textAlign': 'right', 'width': '40px'}
         ),
         html.Div(
@@ -646,7 +633,7 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
             style={
                 'width': '10px',
                 'height': '10px',
-                'backgroundColor': 'red' if monthly_totals['percent of departures on time'].iloc[-1] < 80 else 'transparent',
+                'backgroundColor': 'red' if latest.at[airline, 'percent of departures on time'] < 80 else 'transparent',
                 'borderRadius': '50%',
                 'display': 'inline-block',
                 'marginLeft': '8px'
@@ -658,7 +645,7 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
         # Füge die Zeile zur Tabelle hinzu
         table_rows.append(html.Tr([
             html.Td(airline, style={'width': '19%', 'paddingRight': '0px'}),
-            html.Td(dcc.Graph(figure=sparkline_fig, config={'displayModeBar': False}), style={'width': '3%', 'paddingRight': '1px'}),
+            html.Td(sparkline, style={'width': '3%', 'paddingRight': '1px'}),
             html.Td(flights_value_and_bar, style={'width': '15%', 'paddingRight': '2px'}),
             html.Td(arrivals_content, style=arrivals_style),
             html.Td(departures_content, style=departures_style),
@@ -682,31 +669,12 @@ def update_flights_table(selected_airline, selected_reason, selected_year, selec
     ], style={'fontSize': '0.85rem', 'width': '850px', 'height': '80%'})
 
 
-# Callback für das Balkendiagramm und das Abweichungsdiagramm
-@callback(
-    [Output('cancellations-bar-chart', 'figure'),
-     Output('cancellations-deviation-chart', 'figure')],
-    [Input('airline-dropdown', 'value'),
-     Input('reason-dropdown', 'value'),
-     Input('year-dropdown', 'value'),
-     Input('month-dropdown', 'value')]
-)
-def update_charts(selected_airline, selected_reason, selected_year, selected_month):
+# Balkendiagramm und Abweichungsdiagramm
+def render_charts(slices, selected_year):
     y_shift = 16  # Verschiebung entlang der y-Achse
    
-    filtered_data = cancellations_summary.copy()
-   
-    if selected_airline != 'Alle':
-        filtered_data = filtered_data[filtered_data['airline'] == selected_airline]
-    if selected_reason != 'Alle':
-        filtered_data = filtered_data[filtered_data['cancellation_reason'] == selected_reason]
-    if selected_year != 'Alle':
-        filtered_data = filtered_data[filtered_data['year'] == selected_year]
-    if selected_month != 'Alle':
-        filtered_data = filtered_data[filtered_data['month'] == selected_month]
-   
-    cancellations_sorted = filtered_data.groupby('airline', as_index=False)['cancellations'].sum().sort_values(by='cancellations', ascending=True)
-    cancellations_sorted['formatted_cancellations'] = cancellations_sorted['cancellations'].apply(lambda x: "{:,.0f}".format(x).replace(",", "."))
+    cancellations_sorted = slices['by_airline'].reset_index().sort_values(by='cancellations', ascending=True)
+    cancellations_sorted['formatted_cancellations'] = thousands(cancellations_sorted['cancellations'])
    
     fig_bar = px.bar(
         cancellations_sorted,
@@ -770,20 +738,15 @@ def update_charts(selected_airline, selected_reason, selected_year, selected_mon
     fig_bar.update_traces(textfont_size=11, textposition='outside')
    
     # Berechnung der Abweichungen zum Vorjahr
-    if selected_year == 'Alle':
-        current_year = int(filtered_data['year'].max())
-    else:
-        current_year = int(selected_year)
-    previous_year = current_year - 1
-   
-    current_year_data = filtered_data[filtered_data['year'] == current_year].groupby('airline', as_index=False)['cancellations'].sum()
-    previous_year_data = cancellations_summary[cancellations_summary['year'] == previous_year].groupby('airline', as_index=False)['cancellations'].sum()
+    current_year_data = slices['current_by_airline'].reset_index()
+    previous_year_data = slices['previous_by_airline'].reset_index()
    
     if not previous_year_data.empty:
         deviation_data = current_year_data.merge(previous_year_data, on='airline', suffixes=('_current', '_previous'), how='left')
         deviation_data['cancellations_previous'] = deviation_data['cancellations_previous'].fillna(0)
         deviation_data['deviation'] = ((deviation_data['cancellations_current'] - deviation_data['cancellations_previous']) / deviation_data['cancellations_current']) * 100
-        deviation_data['formatted_deviation'] = deviation_data['deviation'].apply(lambda x: f"{x:+.1f}".replace('.', ',') + ' %')
+        deviation_data['formatted_deviation'] = percent(deviation_data['deviation'], signed=True)
+        deviation_data['hover_text'] = deviation_data['airline'].astype(str) + "<br># Stornos im Vorjahr: " + thousands(deviation_data['cancellations_previous'])
        
         # Sortierung des Abweichungsdiagramms entsprechend der Sortierung des Balkendiagramms
         deviation_data = deviation_data.set_index('airline').reindex(cancellations_sorted['airline']).reset_index()
@@ -810,7 +773,7 @@ def update_charts(selected_airline, selected_reason, selected_year, selected_mon
                 mode='markers',
                 marker=dict(color=color, size=8),
                 hoverinfo='text',
-                hovertext=f"{row['airline']}<br># Stornos im Vorjahr: {row['cancellations_previous']:,.0f}".replace(".", ","),
+                hovertext=row['hover_text'],
                 showlegend=False
             ))
             fig_deviation.add_annotation(
@@ -892,40 +855,18 @@ def update_charts(selected_airline, selected_reason, selected_year, selected_mon
    
     return fig_bar, fig_deviation
 
-# Callback für das Kreisdiagramm
-@callback(
-    Output('cancellations-pie-chart', 'figure'),
-    [Input('airline-dropdown', 'value'),
-     Input('reason-dropdown', 'value'),
-     Input('year-dropdown', 'value'),
-     Input('month-dropdown', 'value')]
-)
-def update_pie_chart(selected_airline, selected_reason, selected_year, selected_month):
-    filtered_data = cancellations_summary.copy()
-   
-    if selected_airline != 'Alle':
-        filtered_data = filtered_data[filtered_data['airline'] == selected_airline]
-    if selected_reason != 'Alle':
-        filtered_data = filtered_data[filtered_data['cancellation_reason'] == selected_reason]
-    if selected_year != 'Alle':
-        filtered_data = filtered_data[filtered_data['year'] == selected_year]
-    if selected_month != 'Alle':
-        filtered_data = filtered_data[filtered_data['month'] == selected_month]
-   
-    sorted_data = filtered_data.groupby('cancellation_reason', as_index=False)['cancellations'].sum().sort_values(by='cancellations', ascending=False)
-    sorted_data['percentage'] = (sorted_data['cancellations'] / sorted_data['cancellations'].sum() * 100).round(1)
-    sorted_data['text'] = sorted_data.apply(lambda x: f"{x['cancellation_reason']}<br>{x['cancellations']:,}".replace(",", ".") + f"<br>({x['percentage']} %)", axis=1)
-   
-    grouped_data = filtered_data.groupby(['cancellation_reason', 'airline'], as_index=False)['cancellations'].sum()
-    hover_texts = grouped_data.groupby('cancellation_reason').apply(
-        lambda x: "<br>".join([f"{row['airline']}: {row['cancellations']}" for index, row in x.iterrows()])
-    ).reset_index(name='info')
-   
-    final_data = filtered_data.groupby('cancellation_reason', as_index=False)['cancellations'].sum()
-    final_data = final_data.merge(hover_texts, on='cancellation_reason', how='left')
-   
+# Kreisdiagramm
+def render_pie_chart(slices):
+    # Ein Durchgang über Grund x Airline liefert Summen und Hover-Texte je Grund
+    grouped_data = slices['by_reason_airline'].reset_index()
+    grouped_data['line'] = grouped_data['airline'].astype(str) + ": " + thousands(grouped_data['cancellations'])
+    final_data = grouped_data.groupby('cancellation_reason', observed=True).agg(
+        cancellations=('cancellations', 'sum'),
+        info=('line', "<br>".join)
+    ).reset_index()
+
     final_data['percentage'] = (final_data['cancellations'] / final_data['cancellations'].sum() * 100).round(1)
-    final_data['text'] = final_data.apply(lambda x: f"<b>{x['cancellation_reason']}</b><br>{x['cancellations']:,}".replace(",", "."), axis=1)
+    final_data['text'] = "<b>" + final_data['cancellation_reason'].astype(str) + "</b><br>" + thousands(final_data['cancellations'])
    
     colors_hex = ["rgba(236, 81, 26, 0.65)", "rgba(248, 125, 7, 0.65)",
                   "rgba(255, 166, 0, 0.65)", "rgba(219, 13, 39, 0.65)"]
@@ -937,7 +878,7 @@ def update_pie_chart(selected_airline, selected_reason, selected_year, selected_
                                  marker=dict(colors=colors_hex),
                                  rotation=194,
                                  direction="clockwise",
-                                 hovertemplate=final_data['info'].apply(lambda x: f'<b> %{{label}}</b><b> | Anzahl der Vorfälle nach Airline</b><br>{x}<extra></extra>'),
+                                 hovertemplate='<b> %{label}</b><b> | Anzahl der Vorfälle nach Airline</b><br>' + final_data['info'] + '<extra></extra>',
                                  hole=.65,
                                  sort=False)])
    
@@ -950,29 +891,16 @@ def update_pie_chart(selected_airline, selected_reason, selected_year, selected_
 
 import plotly.express as px
 
-# Callback für das Small Multiples
-@callback(
-    Output('cancellations-sm-chart', 'figure'),
-    [Input('airline-dropdown', 'value'),
-     Input('reason-dropdown', 'value'),
-     Input('year-dropdown', 'value'),
-     Input('month-dropdown', 'value')]
-)
-def update_bar_chart(selected_airline, selected_reason, selected_year, selected_month):
-    filtered_airlines = airlines_summary.copy()
-    # Anwendung der Filter
-    if selected_airline != 'Alle':
-        filtered_airlines = filtered_airlines[filtered_airlines['airline'] == selected_airline]
-    if selected_reason != 'Alle':
-        filtered_airlines = filtered_airlines[filtered_airlines['cancellation_reason'] == selected_reason]
-    if selected_year != 'Alle':
-        filtered_airlines = filtered_airlines[filtered_airlines['year'] == selected_year]
-    if selected_month != 'Alle':
-        filtered_airlines = filtered_airlines[filtered_airlines['month_int'] == selected_month]
+# Small Multiples
+def render_bar_chart(slices, selected_month):
+    # Kopie des gemeinsamen Ausschnitts, da unten Spalten ergänzt werden
+    filtered_airlines = slices['airlines'].copy()
    
     # Berechnung der Abweichung von 100% für "percent of arrivals on time"
     filtered_airlines['arrivals_deviation'] = 100 - filtered_airlines['percent of arrivals on time']
     filtered_airlines['departures_deviation'] = 100 - filtered_airlines['percent of departures on time']
+    # Facetten nur für tatsächlich vorhandene Airlines (keine leeren Kategorien)
+    filtered_airlines['airline'] = filtered_airlines['airline'].astype(str)
    
     fig = px.scatter(filtered_airlines,
                     x='month_int',
@@ -989,15 +917,15 @@ def update_bar_chart(selected_airline, selected_reason, selected_year, selected_
                     facet_row_spacing= 0.35,
                     #labels={'airline':''}
     )
-    # Anpassen der Markergröße und Transparenz basierend auf der Abweichung bzw. Wert
+    # Anpassen der Markergröße und Transparenz basierend auf der Abweichung bzw. Wert (je Trace als Array)
     for trace in fig.data:
+        y = np.asarray(trace.y, dtype=float)
         if 'arrivals_deviation' in trace.name:
-            trace['marker']['opacity'] = [0.7 if y <= 20 else 0.8 + 0.2 * (100 - y) / 80 for y in trace.y]
-            trace['marker']['size'] = [7 if y <= 20 else 10 + 10 * (y - 20) / 80 for y in trace.y]
-            
+            opacity = np.where(y <= 20, 0.7, 0.8 + 0.2 * (100 - y) / 80)
         else:
-            trace['marker']['opacity'] = [0.9 if y <= 20 else 0.7 + 0.2 * (100 - y) / 80 for y in trace.y]
-            trace['marker']['size'] = [7 if y <= 20 else 10 + 10 * (y - 20) / 80 for y in trace.y]
+            opacity = np.where(y <= 20, 0.9, 0.7 + 0.2 * (100 - y) / 80)
+        size = np.where(y <= 20, 7, 10 + 10 * (y - 20) / 80)
+        trace.marker.update(opacity=opacity, size=size)
     
     # Anpassung der x-Achse basierend auf der Auswahl im Monatsfilter
     if selected_month != 'Alle':
@@ -1057,49 +985,33 @@ def update_bar_chart(selected_airline, selected_reason, selected_year, selected_
     fig.update_traces(marker=dict(line=dict(color='DarkSlateGrey', width=0.5)))
     # Setze die y-Achse so, dass 100 das Maximum ist
     fig.update_yaxes(autorange="reversed", tickvals=[0, 20, 40, 60, 80, 100], ticktext=[100, 80, "","","",0])
-    # Füge für jede Facette spezielle Linien hinzu
-    for i in range(1, len(filtered_airlines['airline'].unique()) + 1):
+    # Linien und Beschriftung je Facette sammeln und in einem Schritt ins Layout übernehmen
+    x_min = filtered_airlines['month_int'].min()
+    x_max = filtered_airlines['month_int'].max()
+    shapes = []
+    annotations = []
+    for i in range(1, filtered_airlines['airline'].nunique() + 1):
         # Grüne Linie bei y=0 (entspricht 100% Optimum)
-        fig.add_shape(
+        shapes.append(dict(
             type="line",
             xref=f"x{i}",
             yref=f"y{i}",
-            x0=filtered_airlines['month_int'].min(),
-            x1=filtered_airlines['month_int'].max(),
+            x0=x_min,
+            x1=x_max,
             y0=0,
             y1=0,
             line=dict(
                 color="lime",
                 width=2
             )
-        )
-        fig.add_annotation(
-        x=filtered_airlines['month_int'].min()-1,  # Anfang des x-Bereichs für jede Facette
-        y=35,  # Y-Position für den Pfeil, muss eventuell angepasst werden
-        text="schlechter",
-          textangle=-90,  # Der Text der Annotation,
-        showarrow=False,  # Zeigt den Pfeil
-        arrowhead=2,  # Stil des Pfeilkopfes
-        xref=f"x{i}",  # x-Referenz auf die entsprechende Facettenachse
-        yref=f"y{i}",  # y-Referenz auf die entsprechende Facettenachse
-        ax=-3,  # Verschiebung des Pfeils in x-Richtung (links)
-        ay=20,  # Verschiebung des Pfeils in y-Richtung (nach unten)
-        arrowcolor="red",  # Farbe des Pfeils
-        font=dict(
-            family="Arial, sans-serif",
-            size=12,
-            color="black"
-        ),
-        arrowsize=1,  # Größe des Pfeils, kann skaliert werden
-        arrowwidth=2,  # Breite des Pfeilstrichs
-    )
+        ))
         # Rote gepunktete Linie bei y=20 (entspricht 80% Schwellenwert)
-        fig.add_shape(
+        shapes.append(dict(
             type="line",
             xref=f"x{i}",
             yref=f"y{i}",
-            x0=filtered_airlines['month_int'].min(),
-            x1=filtered_airlines['month_int'].max(),
+            x0=x_min,
+            x1=x_max,
             y0=20,
             y1=20,
             line=dict(
@@ -1107,11 +1019,77 @@ def update_bar_chart(selected_airline, selected_reason, selected_year, selected_
                 width=1,
                 dash="dot"
             )
-        )
+        ))
+        annotations.append(dict(
+            x=x_min - 1,  # Anfang des x-Bereichs für jede Facette
+            y=35,
+            text="schlechter",
+            textangle=-90,
+            showarrow=False,
+            xref=f"x{i}",  # x-Referenz auf die entsprechende Facettenachse
+            yref=f"y{i}",  # y-Referenz auf die entsprechende Facettenachse
+            font=dict(
+                family="Arial, sans-serif",
+                size=12,
+                color="black"
+            ),
+        ))
+    # Facettentitel von plotly express bleiben erhalten
+    fig.update_layout(
+        shapes=list(fig.layout.shapes) + shapes,
+        annotations=list(fig.layout.annotations) + annotations
+    )
     return fig
 
 
 
+# Ausschnitte der Zusammenfassungen für eine Filterauswahl; einmal je Auswahl bestimmt und von allen Diagrammen genutzt
+def filter_slices(selected_airline, selected_reason, selected_year, selected_month):
+    filters = (selected_airline, selected_reason, selected_year, selected_month)
+    by_airline = cube.cancellations('airline', *filters)
+
+    # Vergleichsjahr für das Abweichungsdiagramm: gewähltes Jahr bzw. das letzte Jahr mit Daten
+    if selected_year == 'Alle':
+        current_year = int(cube.cancellations('year', selected_airline, selected_reason, ALL, selected_month).index.max())
+        current_by_airline = cube.cancellations('airline', selected_airline, selected_reason, current_year, selected_month)
+    else:
+        current_year = int(selected_year)
+        current_by_airline = by_airline
+
+    return {
+        'airlines': cube.airlines(selected_airline, selected_year, selected_month),
+        'by_airline': by_airline,
+        'by_reason_airline': cube.cancellations(('cancellation_reason', 'airline'), *filters),
+        'current_by_airline': current_by_airline,
+        'previous_by_airline': cube.cancellations('airline', year=current_year - 1),
+    }
+
+
+# Ein Callback für Tabelle und Diagramme: die Filter werden einmal angewendet, nicht je Diagramm
+@callback(
+    [Output('flights-table', 'children'),
+     Output('cancellations-bar-chart', 'figure'),
+     Output('cancellations-deviation-chart', 'figure'),
+     Output('cancellations-pie-chart', 'figure'),
+     Output('cancellations-sm-chart', 'figure')],
+    [Input('airline-dropdown', 'value'),
+     Input('reason-dropdown', 'value'),
+     Input('year-dropdown', 'value'),
+     Input('month-dropdown', 'value')]
+)
+@memoize('flights.update_filtered_views', DATA_VERSION)
+def update_filtered_views(selected_airline, selected_reason, selected_year, selected_month):
+    slices = filter_slices(selected_airline, selected_reason, selected_year, selected_month)
+    fig_bar, fig_deviation = render_charts(slices, selected_year)
+    return (
+        render_flights_table(slices, selected_year, selected_month),
+        fig_bar,
+        fig_deviation,
+        render_pie_chart(slices),
+        render_bar_chart(slices, selected_month),
+    )
+
+
 # #Dash-App starten
 # if __name__ == '__main__':
 #     app.run_server(debug=True)
\ No newline at end of file
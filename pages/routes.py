@@ -3,6 +3,7 @@ import dash
 # Dash-App initialisieren
 dash.register_page(__name__, external_stylesheets=['https://stackpath.bootstrapcdn.com/bootstrap/4.3.1/css/bootstrap.min.css', 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.3/css/all.min.css'])
 
+import numpy as np
 import pandas as pd
 import folium
 from branca.colormap import LinearColormap
@@ -13,31 +14,99 @@ import plotly.graph_objs as go
 from plotly.subplots import make_subplots
 from dash.exceptions import PreventUpdate
 
+from datastore import BACKEND, ConnectionPool, LiveRouteDataset, MapStore, data_version, k_or_m, load_route_dataset, memoize
 
-# Daten einlesen und vorverarbeiten
-flights_routes_df = pd.read_csv(r"https://media.githubusercontent.com/media/swrobuts/Flights/main/flight_routes_summary.csv")
 
+if BACKEND == 'duckdb':
+    # Verbindungen werden je Auswahl aus der DuckDB-Datenbank gelesen (FLIGHTS_BACKEND=duckdb)
+    pool = ConnectionPool()
+    route_data = LiveRouteDataset(pool)
+    DATA_VERSION = pool.version
+else:
+    # Routen-Datensatz mit ganzzahligen Flughafen-Schlüsseln, einmal je Datenversion gebaut und von allen Workern geteilt
+    route_data = load_route_dataset()
 
-connections_df = flights_routes_df.groupby(['origin_city', 'destination_city', 'origin_airport_lat', 'origin_airport_lon', 'destination_airport_lat', 'destination_airport_lon', 'year', 'month'])['count(flight_id)'].sum().reset_index()
-connections_df.columns = ['origin_city', 'destination_city', 'origin_airport_lat', 'origin_airport_lon', 'destination_airport_lat', 'destination_airport_lon', 'year', 'month', 'total_flights']
-connections_orig_airports_df = connections_df.groupby(['origin_city', 'origin_airport_lat', 'origin_airport_lon', 'destination_city', 'destination_airport_lat', 'destination_airport_lon', 'year', 'month']).sum('total_flights').reset_index()
-cached_connections_df = flights_routes_df.groupby(['origin_city', 'destination_city', 'origin_airport_lat', 'origin_airport_lon', 'destination_airport_lat', 'destination_airport_lon', 'year', 'month'])['count(flight_id)'].sum().reset_index()
-cached_connections_df.columns = ['origin_city', 'destination_city', 'origin_airport_lat', 'origin_airport_lon', 'destination_airport_lat', 'destination_airport_lon', 'year', 'month', 'total_flights']
-cached_connections_orig_airports_df = cached_connections_df.groupby(['origin_city', 'origin_airport_lat', 'origin_airport_lon', 'destination_city', 'destination_airport_lat', 'destination_airport_lon', 'year', 'month']).sum('total_flights').reset_index()
+    # Stand der geladenen Daten; Teil des Schlüssels im Ergebnis-Cache der Callbacks
+    DATA_VERSION = data_version(['flight_routes_summary'])
 
 # MinMax-Scaler
-max_bewegungen = connections_orig_airports_df['total_flights'].max()
-min_bewegungen = connections_orig_airports_df['total_flights'].min()
+min_bewegungen, max_bewegungen = route_data.flight_range()
 
 # Funktion, um die Flugbewegungen zu skalieren
 def scale_bewegungen(flugbewegungen):
     return (flugbewegungen - min_bewegungen) / (max_bewegungen - min_bewegungen)
 
 # Daten aggregieren, um die Top 30 Flughäfen zu bestimmen
-top_airports = connections_orig_airports_df.groupby(['origin_airport_lat', 'origin_airport_lon', 'origin_city']).agg({
-    'total_flights': 'sum'
-}).reset_index().nlargest(30, 'total_flights')
+top_airports = route_data.top_origins(30)
 
+# Jahre und Städte, für die Karten gerendert werden; Marker nur für Flughäfen mit gültigen Koordinaten
+route_years = set(route_data.years)
+route_cities = {'all'} | set(top_airports['origin_city'].astype(str))
+marker_mask = np.isfinite(top_airports[['origin_airport_lat', 'origin_airport_lon']].to_numpy(dtype='float64')).all(axis=1)
+
+
+# Baut die Routen als GeoJSON-FeatureCollection; die Skalierung wird mit NumPy für alle Routen auf einmal berechnet.
+# Jede Route behält ihre eigene Linienstärke und Deckkraft wie zuvor bei einer PolyLine je Route; nur Routen mit
+# genau derselben Anzahl Flüge (also identischem Stil) werden zu einer MultiLineString zusammengefasst.
+# Routen mit fehlenden Koordinaten fallen weg (Leaflet verwirft sonst die ganze Ebene wegen "Invalid LatLng")
+def route_layer(grouped_lines):
+    coordinates = np.stack([
+        grouped_lines[['origin_airport_lon', 'origin_airport_lat']].to_numpy(dtype='float64'),
+        grouped_lines[['destination_airport_lon', 'destination_airport_lat']].to_numpy(dtype='float64')
+    ], axis=1)
+    valid = np.isfinite(coordinates).all(axis=(1, 2))
+    coordinates = coordinates[valid]
+    scaled = scale_bewegungen(grouped_lines['total_flights'].to_numpy(dtype='float64')[valid])
+    order = np.argsort(scaled, kind='stable')
+    unique_scaled, starts = np.unique(scaled[order], return_index=True)
+    features = []
+    for value, lines in zip(unique_scaled.tolist(), np.split(coordinates[order], starts[1:])):
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'MultiLineString', 'coordinates': lines.tolist()},
+            'properties': {'color': '#ff0000', 'opacity': value * 0.08, 'weight': value * 0.9}
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+# Karte der Flugrouten; wird je Kombination aus Jahr, Start- und Zielflughafen einmal gerendert
+# und danach komprimiert aus dem MapStore ausgeliefert
+def render_route_map(year, origin, destination):
+    year = int(year)
+    if year not in route_years or origin not in route_cities or destination not in route_cities:
+        raise ValueError(f"Unbekannte Auswahl: {year}, {origin}, {destination}")
+    filtered_data = route_data.filter(year, origin, destination)
+
+    m = folium.Map(location=[34.0522, -118.2437], zoom_start=5, tiles='CartoDB Positron')
+   
+    # Gruppiere die Linien nach Start- und Zielflughafen
+    grouped_lines = route_data.with_coordinates(filtered_data.groupby(['origin_key', 'destination_key'], as_index=False)['total_flights'].sum())
+   
+    # Füge alle Linien als eine GeoJSON-Ebene hinzu
+    folium.GeoJson(
+        route_layer(grouped_lines),
+        style_function=lambda feature: feature['properties'],
+        control=False
+    ).add_to(m)
+   
+    # Füge Marker für die 30 Städte mit den meisten Flugbewegungen hinzu (nur mit gültigen Koordinaten)
+    for _, airport in top_airports[marker_mask].iterrows():
+        folium.Marker(
+            location=[airport['origin_airport_lat'], airport['origin_airport_lon']],
+            popup=f"{airport['origin_city']}// Flights: {airport['total_flights']}",
+            icon=folium.Icon(icon='plane', prefix='fa', color='gray')
+        ).add_to(m)
+   
+    return m._repr_html_()
+
+
+route_maps = MapStore('routes', render_route_map, DATA_VERSION)
+
+
+# Rendert die Gesamtnetz-Karten aller Jahre im Hintergrund vor; wird von app.py beim Start aufgerufen,
+# nicht beim Import der Seite (z.B. in Tests oder Skripten)
+def prerender_route_maps():
+    return route_maps.prerender([{'year': year, 'origin': 'all', 'destination': 'all'} for year in sorted(route_years)])
 
 
 # Styles definieren
@@ -117,8 +186,8 @@ layout = html.Div([
         html.Div([
             dcc.Dropdown(
                 id='routes-year-dropdown',
-                options=[{'label': str(year), 'value': year} for year in sorted(connections_df['year'].unique())],
-                value=sorted(connections_df['year'].unique())[-1],
+                options=[{'label': str(year), 'value': year} for year in route_data.years],
+                value=route_data.years[-1],
                 clearable=False,
                 placeholder='Jahr auswählen',
                 style={'marginBottom': '20px'}
@@ -163,7 +232,7 @@ layout = html.Div([
                 ),
             ),
         ]),
-        html.Div(html.Iframe(id='map-iframe', srcDoc=None, width='90%', height='800'), style={'height': '800px'})
+        html.Div(html.Iframe(id='map-iframe', src=None, width='90%', height='800'), style={'height': '800px'})
     ], id='routes-content', className='routes-content', style=styles['routes-content'])
 ], className='routes-container', style=styles['routes-container'])
 
@@ -212,21 +281,13 @@ def apply_sidebar_state(data):
     return sidebar_style, content_style, icon_text
 
 
-# Hilfsfunktion für die Formatierung der Flugzahlen
-def format_k_or_m(value):
-    if value >= 1000000:
-        return f"{value / 1000000:.1f}".replace('.', ',') + ' M'
-    elif value >= 1000:
-        return f"{value / 1000:.1f}".replace('.', ',') + ' K'
-    return str(value)
-
 # Callback für die Aktualisierung der Visualisierungen basierend auf der Auswahl
 @callback(
     [
         Output('all-year', 'children'),
         Output('all-total', 'children'),
         Output('origin-top-flights', 'figure'),
-        Output('map-iframe', 'srcDoc')
+        Output('map-iframe', 'src')
     ],
     [
         Input('origin-dropdown', 'value'),
@@ -236,17 +297,14 @@ def format_k_or_m(value):
 )
 
 
+@memoize('routes.update_visualizations_flights', DATA_VERSION)
 def update_visualizations_flights(selected_origin, selected_destination, selected_year):
     # Beginne mit den gesamten Daten und filtere dann, falls erforderlich
-    filtered_data = connections_df[
-        (connections_df['year'] == selected_year) &
-        ((connections_df['origin_city'] == selected_origin) | (selected_origin == 'all')) &
-        ((connections_df['destination_city'] == selected_destination) | (selected_destination == 'all'))
-    ]
+    filtered_data = route_data.with_cities(route_data.filter(selected_year, selected_origin, selected_destination), ['origin'])
    
     # Aggregate die Daten neu, basierend auf der Filterung
-    origin_flights_by_month = filtered_data.groupby(['month', 'origin_city'])['total_flights'].sum().reset_index()
-    total_flights_per_city = filtered_data.groupby('origin_city', as_index=False)['total_flights'].sum()
+    origin_flights_by_month = filtered_data.groupby(['month', 'origin_city'], observed=True)['total_flights'].sum().reset_index()
+    total_flights_per_city = filtered_data.groupby('origin_city', as_index=False, observed=True)['total_flights'].sum()
     sorted_cities = total_flights_per_city.sort_values(by='total_flights', ascending=False)
     top_origin_cities = sorted_cities['origin_city'].head(10).tolist()
    
@@ -290,40 +348,11 @@ def update_visualizations_flights(selected_origin, selected_destination, selecte
     fig.update_yaxes(title_text='', row=1)
 
    
-    # Karte aktualisieren
-    m = folium.Map(location=[34.0522, -118.2437], zoom_start=5, tiles='CartoDB Positron')
-   
-    # Gruppiere die Linien nach Start- und Zielflughafen
-    grouped_lines = filtered_data.groupby(['origin_airport_lat', 'origin_airport_lon', 'destination_airport_lat', 'destination_airport_lon'])['total_flights'].sum().reset_index()
-   
-    # Füge gruppierte Linien zur Karte hinzu
-    for _, row in grouped_lines.iterrows():
-        scaled_bewegungen = scale_bewegungen(row['total_flights'])
-        opacity = scaled_bewegungen  
-        
-        line = folium.PolyLine(
-            locations=[
-                (row['origin_airport_lat'], row['origin_airport_lon']),
-                (row['destination_airport_lat'], row['destination_airport_lon'])
-            ],
-            color=f'rgba(255, 0, 0, {opacity*0.08})',
-            weight=scaled_bewegungen*0.9,
-        )
-        line.add_to(m)
-   
-    # Füge Marker für die 30 Städte mit den meisten Flugbewegungen hinzu
-    for _, airport in top_airports.iterrows():
-        folium.Marker(
-            location=[airport['origin_airport_lat'], airport['origin_airport_lon']],
-            popup=f"{airport['origin_city']}// Flights: {airport['total_flights']}",
-            icon=folium.Icon(icon='plane', prefix='fa', color='gray')
-        ).add_to(m)
-   
     return (
         f"Jahr: {selected_year}",
-        f"Total Flights: {format_k_or_m(total_flights)}",
+        f"Total Flights: {k_or_m(total_flights)}",
         fig,
-        m._repr_html_()
+        route_maps.url(year=selected_year, origin=selected_origin, destination=selected_destination)
 )
 
 # if __name__ == '__main__':
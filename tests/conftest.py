@@ -0,0 +1,109 @@
+import csv
+import datetime
+import random
+
+import pytest
+
+from datastore import load_summaries
+from etl.config import PipelineConfig
+from etl.pipeline import run_pipeline
+
+
+AIRLINES = [('AA', 'American Airlines Inc.'), ('DL', 'Delta Air Lines Inc.'), ('UA', 'United Air Lines Inc.')]
+
+# SFO ohne Koordinaten, BOS ohne Stadt; XYZ (Flughafen) und ZZ (Airline) fehlen in den Stammdaten
+AIRPORTS = [
+    ('ATL', 'Hartsfield-Jackson', 'Atlanta', 'GA', 'USA', 33.64, -84.42),
+    ('LAX', 'Los Angeles International', 'Los Angeles', 'CA', 'USA', 33.94, -118.40),
+    ('ORD', "Chicago O'Hare", 'Chicago', 'IL', 'USA', 41.97, -87.90),
+    ('JFK', 'John F. Kennedy', 'New York', 'NY', 'USA', 40.63, -73.77),
+    ('SFO', 'San Francisco International', 'San Francisco', 'CA', 'USA', '', ''),
+    ('BOS', 'Logan International', '', 'MA', 'USA', 42.36, -71.01),
+]
+ORIGINS = [airport[0] for airport in AIRPORTS] + ['XYZ']
+CARRIERS = [airline[0] for airline in AIRLINES] + ['ZZ']
+
+COLUMNS = [
+    'FL_DATE', 'OP_CARRIER', 'OP_CARRIER_FL_NUM', 'ORIGIN', 'DEST', 'CRS_DEP_TIME', 'DEP_TIME', 'DEP_DELAY',
+    'TAXI_OUT', 'WHEELS_OFF', 'WHEELS_ON', 'TAXI_IN', 'CRS_ARR_TIME', 'ARR_TIME', 'ARR_DELAY', 'CANCELLED',
+    'CANCELLATION_CODE', 'DIVERTED', 'CRS_ELAPSED_TIME', 'ACTUAL_ELAPSED_TIME', 'AIR_TIME', 'DISTANCE',
+    'CARRIER_DELAY', 'WEATHER_DELAY', 'NAS_DELAY', 'SECURITY_DELAY', 'LATE_AIRCRAFT_DELAY', 'Unnamed: 27',
+]
+
+YEARS = (2014, 2015)
+FLIGHTS_PER_YEAR = 3000
+
+
+def write_year(path, year, flights=FLIGHTS_PER_YEAR):
+    rng = random.Random(year)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for _ in range(flights):
+            day = datetime.date(year, 1, 1) + datetime.timedelta(days=rng.randrange(365))
+            origin, destination = rng.sample(ORIGINS, 2)
+            cancelled = rng.random() < 0.1
+            delay = float(rng.randint(-10, 120))
+            writer.writerow([
+                day.isoformat(), rng.choice(CARRIERS), rng.randint(1, 5000), origin, destination,
+                float(rng.randint(0, 23) * 100 + rng.randint(0, 59)), '' if cancelled else 1517.0, '' if cancelled else delay,
+                12.0, 1530.0, 2400.0, 5.0, 1800.0, 1810.0, '' if cancelled else delay + 3, float(cancelled),
+                rng.choice('ABCD') if cancelled else '', 0.0, 180.0, 190.0, 170.0, float(rng.randint(100, 2500)),
+                '', '', '', '', '', '',
+            ])
+
+
+# Rohdaten im Format der BTS-Dateien: airlines.csv, airports.csv und eine Datei je Jahr
+def write_raw(directory, years=YEARS):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / 'airlines.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['IATA_CODE', 'AIRLINE'])
+        writer.writerows(AIRLINES)
+    with open(directory / 'airports.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['IATA_CODE', 'AIRPORT', 'CITY', 'STATE', 'COUNTRY', 'LATITUDE', 'LONGITUDE'])
+        writer.writerows(AIRPORTS)
+    for year in years:
+        write_year(directory / f'{year}.csv', year)
+    return directory
+
+
+def pipeline_config(directory, raw_dir, **options):
+    return PipelineConfig(
+        database=directory / 'flights.duckdb',
+        raw_dir=raw_dir,
+        output_dir=directory / 'out',
+        workers=options.pop('workers', 1),
+        **options,
+    )
+
+
+# Rohdaten in einem neuen temporären Verzeichnis, z.B. make_raw(years=[2014])
+@pytest.fixture
+def make_raw(tmp_path_factory):
+    return lambda years=YEARS: write_raw(tmp_path_factory.mktemp('raw'), years)
+
+
+# Konfiguration mit eigener Datenbank und eigenem Ausgabeverzeichnis, z.B. make_config(raw_dir, workers=2)
+@pytest.fixture
+def make_config(tmp_path_factory):
+    return lambda raw_dir, **options: pipeline_config(tmp_path_factory.mktemp('pipeline'), raw_dir, **options)
+
+
+@pytest.fixture(scope='session')
+def raw_dir(tmp_path_factory):
+    return write_raw(tmp_path_factory.mktemp('raw'))
+
+
+# Vollständiger Lauf der Pipeline über beide Jahre
+@pytest.fixture(scope='session')
+def pipeline(tmp_path_factory, raw_dir):
+    config = pipeline_config(tmp_path_factory.mktemp('pipeline'), raw_dir)
+    run_pipeline(config)
+    return config
+
+
+@pytest.fixture(scope='session')
+def summaries(pipeline):
+    return load_summaries('cancellations_summary', 'airliness_summary', 'flight_routes_summary', data_dir=pipeline.output_dir)
@@ -0,0 +1,54 @@
+import os
+import time
+
+from datastore import ResultCache, prune_versions
+from datastore.cache import version_dir
+
+
+def test_version_dir_keeps_other_versions(tmp_path):
+    old = version_dir(tmp_path, 'v1')
+    stale = time.time() - 7200
+    os.utime(old, (stale, stale))
+    current = version_dir(tmp_path, 'v2')
+    assert old.exists() and current.exists()
+
+
+def test_prune_versions_removes_stale_versions(tmp_path):
+    old = version_dir(tmp_path / 'namespace', 'v1')
+    recent = version_dir(tmp_path / 'namespace', 'v2')
+    current = version_dir(tmp_path / 'namespace', 'v3')
+    stale = time.time() - 7200
+    os.utime(old, (stale, stale))
+    prune_versions(tmp_path, max_age=3600)
+    assert not old.exists() and recent.exists() and current.exists()
+
+
+def test_prune_versions_keeps_latest_version(tmp_path):
+    only = version_dir(tmp_path / 'namespace', 'v1')
+    stale = time.time() - 7200
+    os.utime(only, (stale, stale))
+    prune_versions(tmp_path, max_age=3600)
+    assert only.exists()
+
+
+def test_result_cache_survives_removed_directory(tmp_path):
+    cache = ResultCache('test', 'v1', cache_dir=str(tmp_path), memory_entries=0)
+    key = cache.key((1,), {})
+    cache.set(key, {'value': 1})
+    assert cache.get(key) == (True, {'value': 1})
+    for path in (tmp_path / 'test').iterdir():
+        for entry in path.iterdir():
+            entry.unlink()
+        path.rmdir()
+    assert cache.get(key) == (False, None)
+    cache.set(key, {'value': 2})
+    assert cache.get(key) == (True, {'value': 2})
+
+
+def test_result_cache_limits_disk_entries(tmp_path):
+    cache = ResultCache('test', 'v1', cache_dir=str(tmp_path), memory_entries=0, disk_entries=32)
+    for value in range(100):
+        cache.set(cache.key((value,), {}), value)
+    assert 32 <= len(list(cache.directory.glob('*.pkl'))) < 32 + cache._evict_every
+    assert cache.get(cache.key((99,), {})) == (True, 99)
+    assert cache.get(cache.key((0,), {})) == (False, None)
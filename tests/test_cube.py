@@ -0,0 +1,96 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from datastore import ALL, ConnectionPool, FilterCube, LiveCube
+from datastore.cube import BREAKDOWNS
+
+
+def selections(cancellations):
+    airline = cancellations['airline'].cat.categories[0]
+    reason = cancellations['cancellation_reason'].cat.categories[0]
+    year = int(cancellations['year'].max())
+    month = int(cancellations['month'].min())
+    return list(itertools.product([ALL, airline], [ALL, reason], [ALL, year], [ALL, month]))
+
+
+# Erwartetes Ergebnis wie in den Callbacks vor dem Würfel: Zeilen filtern, dann summieren
+def filtered_cancellations(cancellations, by, airline, reason, year, month):
+    rows = cancellations
+    for column, value in (('airline', airline), ('cancellation_reason', reason), ('year', year), ('month', month)):
+        if value != ALL:
+            rows = rows[rows[column] == value]
+    return rows.groupby(list(by), observed=True)['cancellations'].sum()
+
+
+def filtered_airlines(airlines, airline, year, month):
+    rows = airlines
+    for column, value in (('airline', airline), ('year', year), ('month', month)):
+        if value != ALL:
+            rows = rows[rows[column] == value]
+    return rows
+
+
+def normalized(series):
+    series = series.copy()
+    series.index = pd.MultiIndex.from_frame(series.index.to_frame().astype(object).astype(str))
+    return series.astype('int64').sort_index()
+
+
+def normalized_rows(df):
+    columns = sorted(df.columns)
+    df = df[columns].astype({column: str for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])})
+    return df.sort_values(columns).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def cube(summaries):
+    cancellations, airlines, _ = summaries
+    return FilterCube(cancellations, airlines)
+
+
+@pytest.fixture(scope='module')
+def live_cube(pipeline):
+    return LiveCube(ConnectionPool(pipeline.database))
+
+
+@pytest.mark.parametrize('by', BREAKDOWNS)
+def test_cancellations_match_pandas_filtering(cube, summaries, by):
+    cancellations = summaries[0]
+    for selection in selections(cancellations):
+        expected = filtered_cancellations(cancellations, by, *selection)
+        pd.testing.assert_series_equal(normalized(cube.cancellations(by, *selection)), normalized(expected), check_names=False)
+
+
+def test_airlines_match_pandas_filtering(cube, summaries):
+    cancellations, airlines, _ = summaries
+    for airline, _, year, month in selections(cancellations):
+        expected = filtered_airlines(airlines, airline, year, month)
+        pd.testing.assert_frame_equal(cube.airlines(airline, year, month), expected)
+
+
+def test_airlines_without_match_are_empty(cube):
+    assert cube.airlines('Keine Airline').empty
+
+
+def test_years(cube, summaries):
+    assert cube.years == sorted(summaries[0]['year'].unique().tolist())
+
+
+@pytest.mark.parametrize('by', BREAKDOWNS)
+def test_live_cube_matches_filter_cube(cube, live_cube, summaries, by):
+    for selection in selections(summaries[0]):
+        expected = cube.cancellations(by, *selection)
+        pd.testing.assert_series_equal(normalized(live_cube.cancellations(by, *selection)), normalized(expected), check_names=False)
+
+
+def test_live_cube_airlines_match_filter_cube(cube, live_cube, summaries):
+    for airline, _, year, month in selections(summaries[0]):
+        expected = cube.airlines(airline, year, month)
+        actual = live_cube.airlines(airline, year, month)
+        pd.testing.assert_frame_equal(normalized_rows(actual), normalized_rows(expected), check_dtype=False)
+
+
+def test_live_cube_years(cube, live_cube):
+    assert live_cube.years == cube.years
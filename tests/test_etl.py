@@ -0,0 +1,127 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+import pytest
+
+from datastore import load_summary, scan_facts, store_path
+from etl import sql
+from etl.pipeline import SUMMARIES, peak_memory_mb, run_pipeline
+
+
+def assert_same_summaries(actual, expected):
+    for name in SUMMARIES:
+        left = load_summary(name, actual.output_dir)
+        right = load_summary(name, expected.output_dir)
+        columns = list(left.columns)
+        assert columns == list(right.columns), name
+        left = left.sort_values(columns).reset_index(drop=True)
+        right = right.sort_values(columns).reset_index(drop=True)
+        pd.testing.assert_frame_equal(left, right, check_categorical=False, obj=name)
+
+
+def test_incremental_matches_full(make_raw, make_config, raw_dir, pipeline):
+    raw = make_raw(years=[2014])
+    config = make_config(raw)
+    run_pipeline(config)
+    shutil.copy(raw_dir / '2015.csv', raw / '2015.csv')
+    run_pipeline(config)
+    assert_same_summaries(config, pipeline)
+
+
+def test_changed_year_is_reloaded(make_raw, make_config, raw_dir, pipeline):
+    raw = make_raw()
+    config = make_config(raw)
+    (raw / '2015.csv').write_text((raw / '2014.csv').read_text().replace('2014-', '2015-'))
+    run_pipeline(config)
+    shutil.copy(raw_dir / '2015.csv', raw / '2015.csv')
+    run_pipeline(config)
+    assert_same_summaries(config, pipeline)
+
+
+def test_changed_master_data_is_applied(make_raw, make_config):
+    raw = make_raw()
+    config = make_config(raw)
+    run_pipeline(config)
+
+    airports = (raw / 'airports.csv').read_text()
+    (raw / 'airports.csv').write_text(airports.replace('San Francisco,CA,USA,,', 'San Francisco,CA,USA,37.62,-122.38').replace('Atlanta', 'Atlanta GA'))
+    (raw / 'airlines.csv').write_text((raw / 'airlines.csv').read_text().replace('Delta Air Lines Inc.', 'Delta Air Lines'))
+    run_pipeline(config)
+
+    fresh = make_config(raw)
+    run_pipeline(fresh)
+    assert_same_summaries(config, fresh)
+    routes = load_summary('flight_routes_summary', config.output_dir)
+    assert {'San Francisco', 'Atlanta GA'} <= set(routes['origin_city']) and 'Atlanta' not in set(routes['origin_city'])
+    assert 'Delta Air Lines' in set(load_summary('airliness_summary', config.output_dir)['airline'])
+
+
+def test_changed_aggregate_sql_rebuilds_aggregates(make_config, raw_dir, monkeypatch):
+    config = make_config(raw_dir, materialize=True)
+    run_pipeline(config)
+    assert 'Security' in set(load_summary('cancellations_summary', config.output_dir)['cancellation_reason'])
+
+    select = sql.AGGREGATES['agg_cancellations'].replace('WHERE "year" = {year}', 'WHERE "year" = {year} AND "cr_id" <> 60')
+    monkeypatch.setitem(sql.AGGREGATES, 'agg_cancellations', select)
+    run_pipeline(config)
+    assert 'Security' not in set(load_summary('cancellations_summary', config.output_dir)['cancellation_reason'])
+
+
+def test_chunked_load_matches_in_memory(make_config, raw_dir, pipeline):
+    config = make_config(raw_dir, memory_limit='256MB')
+    run_pipeline(config)
+    assert_same_summaries(config, pipeline)
+
+
+def test_parallel_matches_sequential(make_config, raw_dir, pipeline):
+    config = make_config(raw_dir, workers=2, materialize=True)
+    run_pipeline(config)
+    assert_same_summaries(config, pipeline)
+
+
+def test_peak_memory_reports_main_and_child_processes(make_config, raw_dir, caplog):
+    caplog.set_level('INFO', logger='etl.pipeline')
+    run_pipeline(make_config(raw_dir))
+    main, children = peak_memory_mb()
+    assert main > 0 and children >= 0
+    assert any('Hauptprozess' in message and 'Kindprozess' in message for message in caplog.messages)
+
+
+def test_run_without_changes_keeps_summaries(make_config, raw_dir):
+    config = make_config(raw_dir)
+    run_pipeline(config)
+    written = {name: store_path(name, config.output_dir).stat().st_mtime_ns for name in SUMMARIES}
+    run_pipeline(config)
+    assert {name: store_path(name, config.output_dir).stat().st_mtime_ns for name in SUMMARIES} == written
+
+
+def test_run_prunes_stale_cache_versions(make_config, raw_dir):
+    config = make_config(raw_dir)
+    old = config.output_dir / '.cache' / 'shared' / 'routes' / 'old'
+    current = config.output_dir / '.cache' / 'shared' / 'routes' / 'current'
+    old.mkdir(parents=True)
+    current.mkdir(parents=True)
+    stale = time.time() - 30 * 24 * 3600
+    os.utime(old, (stale, stale))
+    run_pipeline(config)
+    assert not old.exists() and current.exists()
+
+
+def test_missing_year_files(make_raw, make_config):
+    config = make_config(make_raw(years=[]))
+    with pytest.raises(FileNotFoundError):
+        run_pipeline(config)
+
+
+def test_facts_partitions(make_config, raw_dir, summaries):
+    config = make_config(raw_dir, export_facts=True)
+    run_pipeline(config)
+    assert sorted(path.name for path in config.facts_dir.iterdir()) == ['year=2014', 'year=2015']
+
+    routes = summaries[2]
+    march = scan_facts(['year', 'month_int'], config.facts_dir, year=2015, month_int=3)
+    assert len(march) > 0
+    assert set(march['year']) == {2015} and set(march['month_int']) == {3}
+    assert len(scan_facts(['year'], config.facts_dir)) >= routes['count(flight_id)'].sum()
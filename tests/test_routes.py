@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from datastore import ConnectionPool, LiveRouteDataset, RouteDataset
+from datastore.store import apply_schema
+
+
+# Routen wie in flight_routes_summary: SFO ohne Koordinaten, BOS ohne Stadt, XYZ ganz ohne Stammdaten
+AIRPORTS = {
+    'ATL': ('Atlanta', 33.64, -84.42),
+    'LAX': ('Los Angeles', 33.94, -118.40),
+    'JFK': ('New York', 40.63, -73.77),
+    'SFO': ('San Francisco', np.nan, np.nan),
+    'BOS': (None, 42.36, -71.01),
+    'XYZ': (None, np.nan, np.nan),
+}
+ROUTES = [
+    ('ATL', 'LAX', 2014, 1, 10),
+    ('ATL', 'LAX', 2014, 2, 12),
+    ('LAX', 'JFK', 2014, 1, 7),
+    ('JFK', 'ATL', 2015, 3, 4),
+    ('SFO', 'ATL', 2014, 1, 50),
+    ('ATL', 'SFO', 2015, 1, 60),
+    ('BOS', 'JFK', 2014, 1, 70),
+    ('XYZ', 'LAX', 2015, 2, 80),
+]
+
+
+def routes_summary():
+    rows = []
+    for origin, destination, year, month, flights in ROUTES:
+        origin_city, origin_lat, origin_lon = AIRPORTS[origin]
+        destination_city, destination_lat, destination_lon = AIRPORTS[destination]
+        rows.append({
+            'origin_airport': origin, 'destination_airport': destination,
+            'origin_city': origin_city, 'destination_city': destination_city,
+            'origin_airport_lon': origin_lon, 'origin_airport_lat': origin_lat,
+            'destination_airport_lon': destination_lon, 'destination_airport_lat': destination_lat,
+            'year': year, 'month': month, 'count(flight_id)': flights,
+            'round(sum(distance_km), 0)': 1000.0 * flights, 'avg_distance_km': 1000.0,
+        })
+    return apply_schema(pd.DataFrame(rows), 'flight_routes_summary')
+
+
+# Bisherige Berechnung der Seite: groupby über Städte und Koordinaten beider Enden,
+# Routen mit fehlenden Werten fallen dabei weg; danach Summe je Startflughafen
+def grouped_routes(routes):
+    columns = [f'{endpoint}_{column}' for endpoint in ('origin', 'destination') for column in ('city', 'airport_lat', 'airport_lon')]
+    flights = routes.groupby(columns, observed=True)['count(flight_id)'].sum()
+    return flights.groupby(level=columns[:3], observed=True).sum()
+
+
+@pytest.fixture
+def dataset():
+    return RouteDataset.build(routes_summary())
+
+
+def test_airports_without_city_or_coordinates_are_dropped(dataset):
+    assert dataset.airports['airport'].astype(str).tolist() == ['ATL', 'JFK', 'LAX']
+    assert dataset.airports['city'].notna().all()
+    assert np.isfinite(dataset.airports[['lat', 'lon']].to_numpy()).all()
+
+
+def test_connections_without_known_endpoints_are_dropped(dataset):
+    connections = dataset.with_cities(dataset.connections)
+    assert sorted(connections['origin_city'].astype(str) + '-' + connections['destination_city'].astype(str)) == [
+        'Atlanta-Los Angeles', 'Atlanta-Los Angeles', 'Los Angeles-New York', 'New York-Atlanta',
+    ]
+    assert dataset.flight_range() == (4, 12)
+
+
+def test_top_origins_match_grouped_routes(dataset):
+    top = dataset.top_origins(10)
+    assert np.isfinite(top[['origin_airport_lat', 'origin_airport_lon']].to_numpy()).all()
+    expected = grouped_routes(routes_summary()).sort_values(ascending=False)
+    assert top['total_flights'].tolist() == expected.tolist()
+    assert top['origin_city'].astype(str).tolist() == expected.index.get_level_values('origin_city').astype(str).tolist()
+
+
+def test_filter_by_city(dataset):
+    assert dataset.filter(2014, origin='Atlanta')['total_flights'].sum() == 22
+    assert dataset.filter(2015, destination='San Francisco').empty
+    assert dataset.filter(2014, origin='Boston').empty
+
+
+def test_pipeline_routes_skip_airports_without_coordinates(summaries):
+    routes = summaries[2]
+    dataset = RouteDataset.build(routes)
+    assert set(dataset.airports['airport'].astype(str)) == {'ATL', 'JFK', 'LAX', 'ORD'}
+    assert dataset.connections['total_flights'].sum() == grouped_routes(routes).sum()
+
+
+def test_live_routes_match_route_dataset(pipeline, summaries):
+    dataset = RouteDataset.build(summaries[2])
+    live = LiveRouteDataset(ConnectionPool(pipeline.database))
+    assert live.years == dataset.years
+    assert live.flight_range() == dataset.flight_range()
+    columns = ['origin_city', 'origin_airport_lat', 'origin_airport_lon', 'total_flights']
+    expected = dataset.top_origins(10)[columns].reset_index(drop=True)
+    actual = live.top_origins(10)[columns].reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_categorical=False)
+    for year in dataset.years:
+        expected = dataset.with_cities(dataset.filter(year, origin='Atlanta'))
+        actual = live.with_cities(live.filter(year, origin='Atlanta'))
+        assert actual['total_flights'].sum() == expected['total_flights'].sum()
+        assert set(actual['destination_city'].astype(str)) == set(expected['destination_city'].astype(str))
@@ -0,0 +1,34 @@
+import threading
+import time
+
+import pandas as pd
+
+from datastore.shared import shared_frames
+
+
+def test_shared_frames_are_built_once(tmp_path):
+    builds = []
+
+    def build():
+        builds.append(threading.get_ident())
+        time.sleep(0.2)
+        return [pd.DataFrame({'year': [2014, 2015], 'flights': [1, 2]})]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shared_frames(tmp_path, ['frame'], build))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len(results) == 4
+    for (frame,) in results:
+        pd.testing.assert_frame_equal(frame, pd.DataFrame({'year': [2014, 2015], 'flights': [1, 2]}))
+
+
+def test_numeric_columns_stay_mapped(tmp_path):
+    df = pd.DataFrame({'year': [2014, 2015], 'city': pd.Categorical(['Atlanta', 'Chicago'])})
+    (frame,) = shared_frames(tmp_path, ['frame'], lambda: [df])
+    assert not frame['year'].to_numpy().flags.owndata
+    assert frame['city'].cat.categories.tolist() == ['Atlanta', 'Chicago']
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from datastore import data_version, load_summary, store, write_summary
+
+
+def test_missing_summary_fails_without_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'BASE_DIR', tmp_path)
+    with pytest.raises(FileNotFoundError, match='FLIGHTS_REMOTE_DATA'):
+        load_summary('cancellations_summary', tmp_path)
+    with pytest.raises(FileNotFoundError):
+        data_version(['cancellations_summary'], tmp_path)
+
+
+def test_remote_fallback_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'BASE_DIR', tmp_path)
+    monkeypatch.setattr(store, 'REMOTE_DATA', True)
+    assert store._csv_source('cancellations_summary', tmp_path) == store.REMOTE_URL.format(name='cancellations_summary')
+
+
+def test_summary_round_trip(tmp_path):
+    df = pd.DataFrame({
+        'cancellation_reason': ['Weather', 'Security'], 'airline': ['Delta Air Lines Inc.'] * 2,
+        'year': [2014, 2015], 'month': [1, 12], 'cancellations': [3, 4], 'percentage': [42.9, 57.1],
+    })
+    write_summary(df, 'cancellations_summary', tmp_path)
+    loaded = load_summary('cancellations_summary', tmp_path)
+    assert loaded['airline'].dtype == 'category' and loaded['month'].dtype == 'int8'
+    assert loaded['cancellations'].tolist() == [3, 4]